@@ -0,0 +1,20 @@
+# Frozen in place of the rp2 port's _boot.py (see manifest.py): mounts the
+# filesystem on all of flash storage except the top JOURNAL_BYTES, which
+# journal.reserved_flash() hands to the timer journal. A filesystem made
+# by the stock firmware covers the whole region and does not mount on the
+# smaller one, so the first boot formats it: copy main.py over again after
+# flashing this firmware.
+import os
+import rp2
+
+from journal import JOURNAL_BYTES
+
+storage = rp2.Flash()
+bdev = rp2.Flash(len=storage.ioctl(4, 0) * storage.ioctl(5, 0) - JOURNAL_BYTES)
+try:
+    vfs = os.VfsLfs2(bdev, progsize=256)
+except:
+    os.VfsLfs2.mkfs(bdev, progsize=256)
+    vfs = os.VfsLfs2(bdev, progsize=256)
+os.mount(vfs, "/")
+del os, rp2, storage, bdev, vfs, JOURNAL_BYTES
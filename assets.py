@@ -0,0 +1,96 @@
+"""Bitmaps kept as const bytes, so a frozen build leaves them in flash.
+
+Assets are registered under a name; identical data registered again under
+another name shares the first entry. Each one is handed out as a blit
+source: the (bytes, width, height, format) tuple framebuf blits straight
+from flash, or, on firmware whose blit only takes FrameBuffers, a
+FrameBuffer over a RAM copy.
+"""
+import framebuf
+
+# 8x8 pause sign: two 3 px bars.
+PAUSE = const(b'\xe7\xe7\xe7\xe7\xe7\xe7\xe7\xe7')
+
+
+class Asset:
+    def __init__(self, name, data, width, height):
+        self.names = [name]
+        self.data = data
+        self.width = width
+        self.height = height
+        self.users = 0
+        if _BLIT_FROM_FLASH:
+            self.source = (data, width, height, framebuf.MONO_HMSB)
+            self.ram = 0
+        else:
+            self.source = framebuf.FrameBuffer(bytearray(data), width, height, framebuf.MONO_HMSB)
+            self.ram = len(data)
+
+
+def _blits_from_flash():
+    target = framebuf.FrameBuffer(bytearray(1), 8, 1, framebuf.MONO_HMSB)
+    try:
+        target.blit((b'\x01', 8, 1, framebuf.MONO_HMSB), 0, 0)
+    except TypeError:
+        return False
+    return True
+
+
+_BLIT_FROM_FLASH = _blits_from_flash()
+_by_name = {}
+_by_data = {}
+
+
+def register(name, data, width, height):
+    key = (data, width, height)
+    asset = _by_data.get(key)
+    if asset is None:
+        asset = Asset(name, data, width, height)
+        _by_data[key] = asset
+    elif name not in asset.names:
+        asset.names.append(name)
+    _by_name[name] = asset
+    return asset
+
+
+def get(name):
+    asset = _by_name[name]
+    asset.users += 1
+    return asset
+
+
+def glyph_set(seg_size, seg_space):
+    """128 (source, advance) entries indexed by character code, or None if not pre-rendered."""
+    try:
+        from glyph_data import GLYPHS
+    except ImportError:
+        return None
+    entries = GLYPHS.get((seg_size, seg_space))
+    if entries is None:
+        return None
+    glyphs = [None] * 128
+    for code, width, height, advance, data in entries:
+        asset = register('glyph{}_{}_{}'.format(seg_size, seg_space, code), data, width, height)
+        asset.users += 1
+        glyphs[code] = (asset.source, advance)
+    return glyphs
+
+
+def report():
+    """Print flash and RAM use per asset; saved is against one heap copy per user."""
+    print('{:<24} {:>6} {:>6} {:>5} {:>4} {:>6}'.format('asset', 'size', 'flash', 'ram', 'uses', 'saved'))
+    total = 0
+    for asset in _by_data.values():
+        saved = asset.users * len(asset.data) - asset.ram
+        total += saved
+        print('{:<24} {:>6} {:>6} {:>5} {:>4} {:>6}'.format(
+            '/'.join(asset.names)[:24], '{}x{}'.format(asset.width, asset.height),
+            len(asset.data), asset.ram, asset.users, saved))
+    print('saved', total, 'bytes;', 'blitting from flash' if _BLIT_FROM_FLASH else 'RAM copies')
+
+
+def ram_bytes():
+    return sum(asset.ram for asset in _by_data.values())
+
+
+register('pause', PAUSE, 8, 8)
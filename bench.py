@@ -0,0 +1,399 @@
+"""Hot-path benchmarks with stored baselines and a regression check.
+
+On the host::
+
+    python bench.py [--update-baseline] [--tolerance 0.5]
+
+On the device, after stopping main.py::
+
+    import bench; bench.main()
+
+Results are written to bench_results.json. Baselines are kept per platform
+in bench_baseline.json: timings (``*_us``) may grow by the tolerance,
+rates (``*_per_s``) may drop by it, and counts such as SPI bytes must not
+grow at all. Independently of any baseline, the steady-state render path
+must not allocate (RENDER_ALLOC_LIMIT).
+"""
+try:
+    import machine
+    ON_DEVICE = True
+except ImportError:
+    import sim
+    sim.install()
+    ON_DEVICE = False
+
+import gc
+import json
+import sys
+import time
+
+import assets
+from bench_rotary import BenchRotary, _QUADRATURE
+from kitchen import OLED, Rotary, SegmentedText, State, Timer
+
+try:
+    from panel_dma import DMAFlush
+except ImportError:
+    # Firmware without rp2.DMA.
+    DMAFlush = None
+
+RESULTS_FILE = 'bench_results.json'
+BASELINE_FILE = 'bench_baseline.json'
+# Host timings share the machine with everything else and are noisier,
+# even as the best of ROUNDS over PASSES.
+TOLERANCE = 0.25 if ON_DEVICE else 0.5
+# Bytes the render path may allocate per 1000 ticks, checked with or
+# without a baseline. Neither the device nor the host stand-in, which
+# counts what the firmware allocates while the collector is off (see
+# sim.alloc), may see any.
+RENDER_ALLOC_LIMIT = 0
+
+
+class CountingSPI:
+    """Wraps the panel's SPI bus and counts what goes over it."""
+
+    def __init__(self, spi):
+        self._spi = spi
+        self.transactions = 0
+        self.bytes_written = 0
+
+    def write(self, buf):
+        self._spi.write(buf)
+        self.transactions += 1
+        self.bytes_written += len(buf)
+
+    def reset(self):
+        self.transactions = 0
+        self.bytes_written = 0
+
+
+# The host's speed drifts by half again over windows of a few hundred ms
+# to seconds, longer than all the rounds of one case take, so there each
+# case gets more rounds and the whole set of cases runs in several passes,
+# spread over seconds, that each give the best of their timings. A slow
+# spell can still outlast them all: a regression only counts if it is
+# still there after CONFIRM_PASSES more, CONFIRM_GAP_MS apart.
+ROUNDS = 5 if ON_DEVICE else 15
+PASSES = 1 if ON_DEVICE else 3
+CONFIRM_PASSES = 0 if ON_DEVICE else 6
+CONFIRM_GAP_MS = 2000
+
+
+def _per_call_us(fn, repeat):
+    # Best of several rounds, so a GC pause or host scheduling hiccup in one
+    # round does not read as a regression.
+    best = None
+    for _ in range(ROUNDS):
+        start = time.ticks_us()
+        for _ in range(repeat):
+            fn()
+        elapsed = time.ticks_diff(time.ticks_us(), start) / repeat
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def _per_call_us_after(setup, fn, repeat):
+    # As _per_call_us, timing fn() alone: setup(i) runs before each call,
+    # outside the timing.
+    best = None
+    for _ in range(ROUNDS):
+        elapsed = 0
+        for i in range(repeat):
+            setup(i)
+            start = time.ticks_us()
+            fn()
+            elapsed += time.ticks_diff(time.ticks_us(), start)
+        elapsed /= repeat
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def bench_oled_show(display, repeat=20):
+    spi = display.spi
+    results = {}
+
+    def full():
+        display.invalidate()
+        display.show()
+
+    us = _per_call_us(full, repeat)
+    spi.reset()
+    full()
+    results['oled_show_full'] = {
+        'us': us,
+        'spi_bytes': spi.bytes_written,
+        'spi_transactions': spi.transactions,
+    }
+
+    # One digit changing, as on every second of a running timer.
+    text = SegmentedText(display)
+
+    def tick(i):
+        display.fill(0)
+        text.write('0:05:0' + str(i & 1), 8, 25, 1)
+
+    us = _per_call_us_after(tick, display.show, repeat)
+    spi.reset()
+    for i in range(repeat):
+        tick(i)
+        display.show()
+    results['oled_show_partial'] = {
+        'us': us,
+        'spi_bytes': spi.bytes_written // repeat,
+        'spi_transactions': spi.transactions // repeat,
+    }
+    return results
+
+
+def bench_oled_show_dma(repeat=20):
+    # CPU time of show() with the DMA backend: it returns once the transfer
+    # is started. The wait for the previous one is left out of the timing.
+    display = OLED()
+    backend = DMAFlush(display)
+    display.start_dma(backend)
+    results = {}
+    text = SegmentedText(display)
+    for name, full in (('oled_show_full_dma', True), ('oled_show_partial_dma', False)):
+
+        def tick(i):
+            display.fill(0)
+            text.write('0:05:0' + str(i & 1), 8, 25, 1)
+            if full:
+                display.invalidate()
+            backend.wait()
+
+        sent = backend.bytes_sent
+        us = _per_call_us_after(tick, display.show, repeat)
+        backend.wait()
+        results[name] = {'us': us, 'spi_bytes': (backend.bytes_sent - sent) // (ROUNDS * repeat)}
+    backend.close()
+    return results
+
+
+def bench_segmented_text(display, repeat=50):
+    text = SegmentedText(display)
+    results = {}
+    for s in list(text.segments.keys()) + [':']:
+        name = 'segmented_write_' + ('colon' if s == ':' else 'space' if s == ' ' else 'dash' if s == '-' else s)
+        results[name] = {'us': _per_call_us(lambda: text.write(s, 8, 25, 1), repeat)}
+    results['segmented_write_clock'] = {'us': _per_call_us(lambda: text.write('0:05:00', 8, 25, 1), repeat)}
+    return results
+
+
+def bench_timer_current(repeat=500):
+    timer = Timer(on_alarm=None, on_alarm_off=None)
+    timer.alarm_in = 3 * 60 * 60 - 1
+    timer.start()
+    return {'timer_current': {'us': _per_call_us(timer.current, repeat)}}
+
+
+def bench_encoder(edges=4000):
+    results = {}
+    for name, fast in (('encoder_native', True), ('encoder_python', False)):
+        rotary = BenchRotary(fast)
+        process = rotary._handler
+        best = None
+        for _ in range(ROUNDS):
+            start = time.ticks_us()
+            for i in range(edges):
+                rotary._pins = _QUADRATURE[i & 3]
+                rotary._event_tail = rotary._event_head
+                process(None)
+            elapsed = max(1, time.ticks_diff(time.ticks_us(), start))
+            if best is None or elapsed < best:
+                best = elapsed
+        results[name] = {'edges_per_s': edges * 1_000_000 // best}
+    return results
+
+
+def bench_state_tick(display, repeat=20):
+    state = State(pause_icon=None, segmented_text=None, display=display, rotary=Rotary())
+    state.timer.alarm_in = 5 * 60
+    state.timer.start()
+
+    def tick():
+        state.tick()
+        display.show()
+
+    # Nothing changes between back-to-back ticks; this one moves the
+    # seconds every call, so the changed widgets are redrawn and sent.
+    seconds = [0]
+
+    def tick_second():
+        seconds[0] ^= 1
+        state.timer.alarm_in = 5 * 60 - 1 - seconds[0]
+        state.tick()
+        display.show()
+
+    return {'state_tick': {'us': _per_call_us(tick, repeat)},
+            'state_tick_second': {'us': _per_call_us(tick_second, repeat)}}
+
+
+def bench_render_alloc(display, ticks=1000):
+    # With the collector off, gc.mem_alloc() only grows, so any allocation
+    # on the render path shows up. main() fails unless it is within
+    # RENDER_ALLOC_LIMIT: zero.
+    state = State(pause_icon=None, segmented_text=None, display=display, rotary=Rotary())
+    state.timer.alarm_in = 5 * 60
+    state.timer.start()
+    for _ in range(10):
+        state.tick()
+        display.show()
+    gc.collect()
+    gc.disable()
+    try:
+        before = gc.mem_alloc()
+        for _ in range(ticks):
+            state.tick()
+            display.show()
+        allocated = max(0, gc.mem_alloc() - before)
+    finally:
+        gc.enable()
+    return {'render_alloc': {'bytes_per_1000_ticks': allocated * 1000 // ticks}}
+
+
+def bench_boot(display, repeat=5):
+    # Panel set-up, building the state and the first frame; on the device
+    # the import and compile time before this shows in the console's boot.
+    def boot():
+        booted = OLED(spi=CountingSPI(display.spi._spi))
+        state = State(pause_icon=None, segmented_text=None, display=booted, rotary=Rotary())
+        state.frame()
+        return booted
+
+    spi = boot().spi
+    return {'boot': {'us': _per_call_us(boot, repeat), 'spi_transactions': spi.transactions}}
+
+
+def bench_assets():
+    # Heap held by bitmap assets once the screen is built; zero when blit
+    # reads them from flash.
+    return {'assets': {'ram_bytes': assets.ram_bytes()}}
+
+
+def _run_timed(display):
+    results = {}
+    results.update(bench_oled_show(display))
+    if DMAFlush is not None:
+        results.update(bench_oled_show_dma())
+    results.update(bench_segmented_text(display))
+    results.update(bench_timer_current())
+    results.update(bench_encoder())
+    results.update(bench_boot(display))
+    results.update(bench_state_tick(display))
+    return results
+
+
+def _keep_best(best, results):
+    for name, metrics in results.items():
+        kept = best.setdefault(name, {})
+        for metric, value in metrics.items():
+            ref = kept.get(metric)
+            if ref is None:
+                kept[metric] = value
+            elif metric == 'us':
+                kept[metric] = min(ref, value)
+            else:
+                # Rates go up as they improve; counts should not move at all.
+                kept[metric] = max(ref, value)
+
+
+def _counted_display():
+    display = OLED()
+    display.spi = CountingSPI(display.spi)
+    return display
+
+
+def run():
+    display = _counted_display()
+    results = {}
+    for _ in range(PASSES):
+        _keep_best(results, _run_timed(display))
+    results.update(bench_render_alloc(display))
+    results.update(bench_assets())
+    return results
+
+
+def check(results, baseline, tolerance=TOLERANCE):
+    """Return a list of regressions of ``results`` against ``baseline``."""
+    failures = []
+    for name, metrics in results.items():
+        reference = baseline.get(name, {})
+        for metric, value in metrics.items():
+            ref = reference.get(metric)
+            if ref is None:
+                continue
+            if metric == 'us':
+                ok = value <= ref * (1 + tolerance)
+            elif metric.endswith('_per_s'):
+                ok = value >= ref * (1 - tolerance)
+            else:
+                ok = value <= ref
+            if not ok:
+                failures.append('{}.{}: {} (baseline {})'.format(name, metric, value, ref))
+    return failures
+
+
+def check_render_alloc(results, limit=RENDER_ALLOC_LIMIT):
+    """Return a failure if the steady-state render path allocated more than limit."""
+    allocated = results['render_alloc']['bytes_per_1000_ticks']
+    if allocated > limit:
+        return ['render_alloc.bytes_per_1000_ticks: {} (limit {})'.format(allocated, limit)]
+    return []
+
+
+def _load(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except OSError:
+        return {}
+
+
+def _save(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    tolerance = TOLERANCE
+    if '--tolerance' in argv:
+        tolerance = float(argv[argv.index('--tolerance') + 1])
+
+    results = run()
+    baselines = _load(BASELINE_FILE)
+    baseline = baselines.get(sys.platform)
+    regressions = []
+    if baseline is not None and '--update-baseline' not in argv:
+        regressions = check(results, baseline, tolerance)
+        passes = 0
+        while regressions and passes < CONFIRM_PASSES:
+            time.sleep_ms(CONFIRM_GAP_MS)
+            _keep_best(results, _run_timed(_counted_display()))
+            regressions = check(results, baseline, tolerance)
+            passes += 1
+    for name in sorted(results):
+        print(name, results[name])
+    _save(RESULTS_FILE, {'platform': sys.platform, 'results': results})
+
+    if '--update-baseline' in argv:
+        baselines[sys.platform] = results
+        _save(BASELINE_FILE, baselines)
+        print('baseline updated for', sys.platform)
+        return 0
+
+    failures = check_render_alloc(results)
+    if baseline is None:
+        print('no baseline for', sys.platform)
+    else:
+        failures += regressions
+    for failure in failures:
+        print('REGRESSION', failure)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""Precompile the firmware modules with mpy-cross, so the device does not
+compile them from source at every power-up.
+
+    python build.py [--deploy]
+
+Writes build/<module>.mpy for MODULES. --deploy copies them to the board
+with mpremote, together with main.py, and removes the .py sources there:
+MicroPython imports a .py before the .mpy of the same name. For a firmware
+image with the modules frozen into flash, see manifest.py.
+
+Set MPY_CROSS if mpy-cross is not on the PATH; it must match the
+firmware's bytecode version.
+"""
+import os
+import subprocess
+import sys
+
+MODULES = (
+    'rotary_irq.py',
+    'assets.py',
+    'glyph_data.py',
+    'profiler.py',
+    'kitchen.py',
+    'panel_dma.py',
+    'power.py',
+    'journal.py',
+    'runtime.py',
+    'protocol.py',
+    'console.py',
+)
+BUILD_DIR = 'build'
+MPY_CROSS = os.environ.get('MPY_CROSS', 'mpy-cross')
+# The RP2040 is a Cortex-M0+; the native IRQ handler in rotary_irq needs the
+# architecture to be compiled ahead of time.
+ARCH = '-march=armv6m'
+
+
+def compile_modules():
+    os.makedirs(BUILD_DIR, exist_ok=True)
+    outputs = []
+    for module in MODULES:
+        output = os.path.join(BUILD_DIR, module[:-3] + '.mpy')
+        subprocess.run([MPY_CROSS, ARCH, '-o', output, module], check=True)
+        outputs.append(output)
+    return outputs
+
+
+def deploy(outputs):
+    for output in outputs:
+        subprocess.run(['mpremote', 'fs', 'cp', output, ':'], check=True)
+    for module in MODULES:
+        # Absent on a board that was deployed this way before.
+        subprocess.run(['mpremote', 'fs', 'rm', ':' + module], check=False)
+    subprocess.run(['mpremote', 'fs', 'cp', 'main.py', ':'], check=True)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    outputs = compile_modules()
+    for output in outputs:
+        print(output, os.stat(output)[6], 'bytes')
+    if '--deploy' in argv:
+        deploy(outputs)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
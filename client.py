@@ -0,0 +1,219 @@
+"""Host side of the binary serial protocol, see protocol.py.
+
+    python client.py PORT status
+    python client.py PORT set INDEX SECONDS
+    python client.py PORT start INDEX
+    python client.py PORT pause INDEX
+    python client.py PORT melody INDEX
+    python client.py PORT watch [INTERVAL_MS]
+    python client.py --loopback
+
+PORT is the board's USB serial device, opened with pyserial. --loopback
+runs the firmware on the host stand-ins instead, connected through an
+in-memory link, and checks the commands, the telemetry, the dropping
+of stale telemetry while the host is not reading, and that the unit
+does not go to sleep while telemetry is on.
+"""
+
+import struct
+import sys
+import threading
+import time
+
+import sim
+
+# The protocol module is firmware; it needs the MicroPython stand-ins.
+sim.install()
+
+import protocol  # noqa: E402
+from protocol import (ACK, ACK_BAD_COMMAND, ACK_BAD_TIMER, ACK_OK, MELODY, PAUSE, QUERY, SET,  # noqa: E402
+                      START, STATUS, TELEMETRY, TELEMETRY_DATA, Decoder, encode, parse_telemetry,
+                      parse_timers)
+
+
+class Client:
+    def __init__(self, port, timeout=1.0):
+        self._port = port
+        self._decoder = Decoder()
+        self._pending = []
+        self.timeout = timeout
+
+    def send(self, kind, payload=b''):
+        self._port.write(encode(kind, payload))
+
+    def receive(self, kind, timeout=None):
+        """Return the payload of the next packet of this kind, or None on timeout."""
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        while True:
+            for i, (packet_kind, payload) in enumerate(self._pending):
+                if packet_kind == kind:
+                    del self._pending[i]
+                    return payload
+            if time.monotonic() >= deadline:
+                return None
+            self._pending += self._decoder.feed(self._port.read(256))
+
+    def discard(self):
+        self._pending.clear()
+
+    def status(self):
+        self.send(QUERY)
+        payload = self.receive(STATUS)
+        return None if payload is None else parse_timers(payload)
+
+    def command(self, kind, index, seconds=None):
+        """Send SET, START, PAUSE or MELODY; returns the ACK status byte."""
+        payload = bytes((index,))
+        if seconds is not None:
+            payload += struct.pack('<I', seconds)
+        self.send(kind, payload)
+        while True:
+            ack = self.receive(ACK)
+            if ack is None:
+                raise TimeoutError('no reply to command 0x{:02x}'.format(kind))
+            if ack[0] == kind:
+                return ack[1]
+
+    def telemetry(self, interval_ms):
+        self.send(TELEMETRY, struct.pack('<H', interval_ms))
+        return self.receive(ACK)
+
+
+def format_timers(timers):
+    return '  '.join('{}:{}{} {}.{:03d}s/{}s'.format(
+        i, 'R' if flags & protocol.FLAG_RUNNING else '-', 'A' if flags & protocol.FLAG_ALARM else '-',
+        remaining_ms // 1000, remaining_ms % 1000, duration_s)
+        for i, (flags, remaining_ms, duration_s) in enumerate(timers))
+
+
+def open_serial(path):
+    try:
+        import serial
+    except ImportError:
+        raise SystemExit('pyserial is needed to talk to a board: pip install pyserial')
+    return serial.Serial(path, 115200, timeout=0.1)
+
+
+def start_firmware(link, timer_count=3, idle_after_ms=200):
+    """Run the firmware's runtime on a thread, talking over link; returns its Protocol and IdleGovernor.
+
+    The governor's lightsleep only counts the calls in governor.wakeups.
+    """
+    from console import Console
+    from kitchen import OLED, Rotary, State
+    from power import IdleGovernor
+    from profiler import Profiler
+    from runtime import Runtime
+    import uasyncio as asyncio
+
+    display = OLED()
+    state = State(pause_icon=None, segmented_text=None, display=display, rotary=Rotary(),
+                  timer_count=timer_count)
+    device = protocol.Protocol(state, Profiler(), stream=link.from_device,
+                               writable=link.from_device.writable)
+    governor = IdleGovernor(state, display, idle_after_ms, sleep=lambda ms=None: None, protocol=device)
+    console = Console(state, None, governor, protocol=device, stream=link.to_device)
+    runtime = Runtime(state, display, console=console, governor=governor, protocol=device)
+    threading.Thread(target=asyncio.run, args=(runtime.run(),), daemon=True).start()
+    return device, governor
+
+
+def _check(condition, what):
+    print('ok  ' if condition else 'FAIL', what)
+    return bool(condition)
+
+
+def loopback():
+    from sim.serial import Loopback
+
+    link = Loopback(capacity=256)
+    device, governor = start_firmware(link)
+    client = Client(link)
+    ok = True
+
+    timers = client.status()
+    ok &= _check(timers is not None and len(timers) == 3, 'status lists 3 timers')
+    ok &= _check(client.command(SET, 1, 90) == ACK_OK, 'set timer 1 to 90 s')
+    ok &= _check(client.command(START, 1) == ACK_OK, 'start timer 1')
+    time.sleep(0.3)
+    timers = client.status()
+    flags, remaining_ms, duration_s = timers[1]
+    ok &= _check(flags & protocol.FLAG_RUNNING and 89_000 < remaining_ms < 90_000 and duration_s == 90,
+                 'timer 1 counts down: ' + format_timers(timers))
+    ok &= _check(client.command(PAUSE, 1) == ACK_OK and not client.status()[1][0] & protocol.FLAG_RUNNING,
+                 'pause timer 1')
+    ok &= _check(client.command(START, 7) == ACK_BAD_TIMER, 'start timer 7 is refused')
+    ok &= _check(client.command(MELODY, 2) == ACK_OK, 'melody 2 selected')
+    ok &= _check(client.command(MELODY, 9) == ACK_BAD_COMMAND, 'melody 9 is refused')
+
+    # Noise and a packet with a bad CRC are skipped; the next command still works.
+    errors = device.rx_errors
+    link.write(b'\xa5\x02\x03\x01\x00')
+    ok &= _check(client.status() is not None and device.rx_errors == errors + 1,
+                 'bad packet counted and skipped')
+
+    ok &= _check(client.telemetry(20) is not None, 'telemetry every 20 ms')
+    wakeups = governor.wakeups
+    received = [client.receive(TELEMETRY_DATA) for _ in range(5)]
+    ok &= _check(all(received), '5 telemetry packets')
+    uptime = [parse_telemetry(payload)[0] for payload in received if payload]
+    ok &= _check(uptime == sorted(uptime), 'telemetry in order')
+
+    # Stop reading: the link fills up, and the firmware keeps at most the
+    # packet it is part-way through plus one pending telemetry packet,
+    # replacing the latter instead of queueing the backlog.
+    dropped = device.output.dropped
+    time.sleep(0.5)
+    ok &= _check(device.output.dropped > dropped and len(device.output) <= 2,
+                 'stale telemetry dropped while not read ({} dropped)'.format(device.output.dropped - dropped))
+    ok &= _check(governor.wakeups == wakeups, 'no lightsleep while telemetry is on')
+    ok &= _check(client.telemetry(0) is not None, 'telemetry off')
+    time.sleep(0.1)
+    client.discard()
+    ok &= _check(client.receive(TELEMETRY_DATA, timeout=0.2) is None, 'no telemetry after off')
+    time.sleep(0.2)
+    ok &= _check(governor.wakeups > wakeups, 'lightsleep once telemetry is off and the unit idles')
+
+    print('all ok' if ok else 'FAILED')
+    return 0 if ok else 1
+
+
+def main(argv):
+    if argv == ['--loopback']:
+        return loopback()
+    if len(argv) < 2:
+        print(__doc__)
+        return 2
+    client = Client(open_serial(argv[0]))
+    command, args = argv[1], [int(arg) for arg in argv[2:]]
+    if command == 'status':
+        timers = client.status()
+        if timers is None:
+            print('no reply')
+            return 1
+        print(format_timers(timers))
+        return 0
+    if command in ('set', 'start', 'pause', 'melody'):
+        kind = {'set': SET, 'start': START, 'pause': PAUSE, 'melody': MELODY}[command]
+        status = client.command(kind, *args)
+        print('ok' if status == ACK_OK else 'refused: {}'.format(status))
+        return 0 if status == ACK_OK else 1
+    if command == 'watch':
+        client.telemetry(args[0] if args else 1000)
+        try:
+            while True:
+                payload = client.receive(TELEMETRY_DATA, timeout=5)
+                if payload is None:
+                    continue
+                uptime_ms, frames, frame_max_us, encoder, overflows, timers = parse_telemetry(payload)
+                print('{:10} ms  frames {} max {} us  encoder {} overflows {}  {}'.format(
+                    uptime_ms, frames, frame_max_us, encoder, overflows, format_timers(timers)))
+        except KeyboardInterrupt:
+            client.telemetry(0)
+        return 0
+    print(__doc__)
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,66 @@
+import sys
+import uasyncio as asyncio
+
+import assets
+from protocol import SYNC
+
+_SYNC = bytes((SYNC,))
+
+
+class Console:
+    """Line commands on the USB serial port while the runtime is running.
+
+        prof on      start profiling State's stages
+        prof off     stop profiling; the stages run unwrapped again
+        prof         print the profiler report
+        prof reset   clear the profiler counters
+        assets       print flash and RAM use of the bitmap assets
+        boot         print the time from reset to the first frame on the panel
+        power        print the time spent active, dimmed and asleep
+        power reset  clear the power-state times
+
+    With a Protocol, input starting with its sync byte is a binary packet
+    and goes to it instead. Ctrl-C must then be read as data, since it can
+    turn up inside a packet; on its own at the start of a line it still
+    interrupts the program.
+    """
+
+    def __init__(self, state, profiler, governor=None, protocol=None, stream=sys.stdin):
+        self._state = state
+        self._profiler = profiler
+        self._governor = governor
+        self._protocol = protocol
+        self._stream = stream
+
+    async def run(self):
+        reader = asyncio.StreamReader(self._stream)
+        while True:
+            first = await reader.read(1)
+            if self._protocol is not None:
+                if first == _SYNC:
+                    await self._protocol.receive(reader)
+                    continue
+                if first == b'\x03':
+                    raise KeyboardInterrupt
+            line = first + await reader.readline()
+            self.handle(line.strip())
+
+    def handle(self, line):
+        if line == b'prof on':
+            self._state.instrument(self._profiler)
+        elif line == b'prof off':
+            self._state.instrument(None)
+        elif line == b'prof':
+            self._profiler.report()
+        elif line == b'prof reset':
+            self._profiler.reset()
+        elif line == b'assets':
+            assets.report()
+        elif line == b'power' and self._governor is not None:
+            self._governor.report()
+        elif line == b'power reset' and self._governor is not None:
+            self._governor.reset()
+        elif line == b'boot':
+            print('first frame', self._state.display.first_frame_ms, 'ms after reset')
+        elif line:
+            print('unknown command:', line.decode())
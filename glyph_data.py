@@ -0,0 +1,34 @@
+# Generated by make_assets.py; do not edit.
+# (seg_size, seg_space) -> ((code, width, height, advance, MONO_HMSB bitmap), ...)
+GLYPHS = {
+    (15, 6): (
+        (48, 18, 33, 21, b'\xf8\x7f\x00\xfc\xff\x00\xfa\x7f\x01\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x02\x00\x01\x00\x00\x00\x02\x00\x01\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\xfa\x7f\x01\xfc\xff\x00\xf8\x7f\x00'),
+        (49, 18, 33, 21, b'\x00\x00\x00\x00\x00\x00\x02\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x02\x00\x00\x00\x00\x00\x02\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x02\x00\x00\x00\x00\x00\x00\x00\x00'),
+        (50, 18, 33, 21, b'\xf8\x7f\x00\xfc\xff\x00\xf8\x7f\x01\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\xf8\x7f\x01\xfc\xff\x00\xfa\x7f\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\xfa\x7f\x00\xfc\xff\x00\xf8\x7f\x00'),
+        (51, 18, 33, 21, b'\xf8\x7f\x00\xfc\xff\x00\xf8\x7f\x01\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\xf8\x7f\x01\xfc\xff\x00\xf8\x7f\x01\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\xf8\x7f\x01\xfc\xff\x00\xf8\x7f\x00'),
+        (52, 18, 33, 21, b'\x00\x00\x00\x00\x00\x00\x02\x00\x01\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\xfa\x7f\x01\xfc\xff\x00\xf8\x7f\x01\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x00\x01\x00\x00\x00\x00\x00\x00'),
+        (53, 18, 33, 21, b'\xf8\x7f\x00\xfc\xff\x00\xfa\x7f\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\xfa\x7f\x00\xfc\xff\x00\xf8\x7f\x01\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\xf8\x7f\x01\xfc\xff\x00\xf8\x7f\x00'),
+        (54, 18, 33, 21, b'\xf8\x7f\x00\xfc\xff\x00\xfa\x7f\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\x07\x00\x00\xfa\x7f\x00\xfc\xff\x00\xfa\x7f\x01\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\xfa\x7f\x01\xfc\xff\x00\xf8\x7f\x00'),
+        (55, 18, 33, 21, b'\xf8\x7f\x00\xfc\xff\x00\xf8\x7f\x01\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x00\x01\x00\x00\x00\x00\x00\x01\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x00\x01\x00\x00\x00\x00\x00\x00'),
+        (56, 18, 33, 21, b'\xf8\x7f\x00\xfc\xff\x00\xfa\x7f\x01\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\xfa\x7f\x01\xfc\xff\x00\xfa\x7f\x01\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\xfa\x7f\x01\xfc\xff\x00\xf8\x7f\x00'),
+        (57, 18, 33, 21, b'\xf8\x7f\x00\xfc\xff\x00\xfa\x7f\x01\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\x07\x80\x03\xfa\x7f\x01\xfc\xff\x00\xf8\x7f\x01\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\x00\x80\x03\xf8\x7f\x01\xfc\xff\x00\xf8\x7f\x00'),
+        (32, 18, 33, 21, b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'),
+        (45, 18, 33, 21, b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\xf8\x7f\x00\xfc\xff\x00\xf8\x7f\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'),
+        (58, 3, 33, 7, b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x06\x06\x00\x00\x00\x00\x00\x00\x00\x00\x06\x06\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'),
+    ),
+    (5, 3): (
+        (48, 8, 13, 8, b'\x18<Z\xe7\xe7B\x00B\xe7\xe7Z<\x18'),
+        (49, 8, 13, 8, b'\x00\x00\x02\x07\x07\x02\x00\x02\x07\x07\x02\x00\x00'),
+        (50, 8, 13, 8, b'\x18<X\xe0\xe0X<\x1a\x07\x07\x1a<\x18'),
+        (51, 8, 13, 8, b'\x18<X\xe0\xe0X<X\xe0\xe0X<\x18'),
+        (52, 8, 13, 8, b'\x00\x00B\xe7\xe7Z<X\xe0\xe0@\x00\x00'),
+        (53, 8, 13, 8, b'\x18<\x1a\x07\x07\x1a<X\xe0\xe0X<\x18'),
+        (54, 8, 13, 8, b'\x18<\x1a\x07\x07\x1a<Z\xe7\xe7Z<\x18'),
+        (55, 8, 13, 8, b'\x18<X\xe0\xe0@\x00@\xe0\xe0@\x00\x00'),
+        (56, 8, 13, 8, b'\x18<Z\xe7\xe7Z<Z\xe7\xe7Z<\x18'),
+        (57, 8, 13, 8, b'\x18<Z\xe7\xe7Z<X\xe0\xe0X<\x18'),
+        (32, 8, 13, 8, b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'),
+        (45, 8, 13, 8, b'\x00\x00\x00\x00\x00\x18<\x18\x00\x00\x00\x00\x00'),
+        (58, 3, 13, 2, b'\x00\x00\x00\x06\x06\x06\x06\x00\x00\x00\x00\x00\x00'),
+    ),
+}
@@ -0,0 +1,154 @@
+"""Append-only journal of timer state in a ring of flash sectors.
+
+Each record is 16 bytes: sequence number, remaining ms, set duration in
+seconds, timer index, flags and a CRC32 of the rest. Records go one per
+program slot (a 256-byte page on the RP2040) into the current sector;
+when it is full the oldest sector in the ring is erased and becomes the
+current one, starting with a snapshot of every timer. The newest sector
+therefore always holds each timer's latest state, and load() needs one
+backward scan of it.
+
+The flash is anything with the extended block protocol: rp2.Flash over a
+region outside the filesystem on the device (see reserved_flash()),
+sim.flash.FileFlash on the host.
+"""
+import binascii
+import struct
+import time
+
+_RECORD = '<IIHBBI'
+RECORD_SIZE = const(16)
+_FLAG_RUNNING = const(1)
+_ERASED = b'\xff' * RECORD_SIZE
+# Flash kept for the journal at the top of the storage region: 4 sectors.
+JOURNAL_BYTES = const(16384)
+
+
+def reserved_flash(size=JOURNAL_BYTES, path='/'):
+    """rp2.Flash over the top size bytes of storage, or None if the filesystem uses them.
+
+    The stock firmware formats all of storage as the filesystem, and
+    remounts it whole at every boot, so the space is only there on a
+    firmware that freezes this repository's _boot.py (see manifest.py).
+    """
+    import os
+    import rp2
+    storage = rp2.Flash()
+    block_size = storage.ioctl(5, 0)
+    end = storage.ioctl(4, 0) * block_size
+    fs = os.statvfs(path)
+    # f_bsize * f_blocks: where the filesystem ends.
+    if fs[0] * fs[2] > end - size:
+        return None
+    return rp2.Flash(start=end - size, len=size)
+
+
+class Journal:
+    def __init__(self, flash, slot_size=256, interval_ms=60_000):
+        self._flash = flash
+        self._sectors = flash.ioctl(4, 0)
+        self._sector_size = flash.ioctl(5, 0)
+        self._slots = self._sector_size // slot_size
+        self._slot_size = slot_size
+        # While a timer runs its remaining time is written at most this often.
+        self.interval_ms = interval_ms
+        self._page = bytearray(b'\xff' * slot_size)
+        self._record = bytearray(RECORD_SIZE)
+        self._sector = self._sectors - 1
+        self._next = self._slots
+        self._seq = 0
+        # Per timer index: (remaining_ms, duration_s, running, ticks_ms) last written.
+        self._written = {}
+        self.records_written = 0
+
+    def load(self):
+        """Find the newest sector and return {index: (remaining_ms, duration_ms, running)} from it."""
+        newest = None
+        for sector in range(self._sectors):
+            record = self._read(sector, 0)
+            if record is not None and (newest is None or record[0] > newest[1]):
+                newest = (sector, record[0])
+        if newest is None:
+            return {}
+
+        sector = newest[0]
+        self._sector = sector
+        self._next = 0
+        state = {}
+        for slot in range(self._slots - 1, -1, -1):
+            record = self._read(sector, slot)
+            if record is None:
+                if self._next == 0 and self._record != _ERASED:
+                    # A torn write still takes its slot.
+                    self._next = slot + 1
+                continue
+            if self._next == 0:
+                self._next = slot + 1
+            seq, remaining_ms, duration_s, index, flags, _ = record
+            if seq >= self._seq:
+                self._seq = seq + 1
+            if index not in state:
+                state[index] = (remaining_ms, duration_s * 1000, bool(flags & _FLAG_RUNNING))
+                self._written[index] = (remaining_ms, duration_s, bool(flags & _FLAG_RUNNING), time.ticks_ms())
+        return state
+
+    def restore(self, timers):
+        """Load the journal and put each timer back as it was last recorded."""
+        state = self.load()
+        for index, (remaining_ms, duration_ms, running) in state.items():
+            if index < len(timers):
+                timers[index].restore(remaining_ms, duration_ms, running)
+        return len(state)
+
+    def sync(self, timers):
+        """Append a record for every timer whose state changed, or whose running countdown is due."""
+        now = time.ticks_ms()
+        for index in range(len(timers)):
+            timer = timers[index]
+            remaining_ms = timer.remaining_ms()
+            duration_s = timer.duration_ms // 1000
+            last = self._written.get(index)
+            if last is not None and last[1] == duration_s and last[2] == timer.running:
+                if timer.running:
+                    if time.ticks_diff(now, last[3]) < self.interval_ms:
+                        continue
+                elif last[0] == remaining_ms:
+                    continue
+            self._append(index, remaining_ms, duration_s, timer.running, timers)
+
+    def _append(self, index, remaining_ms, duration_s, running, timers):
+        if self._next >= self._slots:
+            # The snapshot that opens the next sector includes this change.
+            self._advance(timers)
+            return
+        self._write(index, remaining_ms, duration_s, running)
+
+    def _advance(self, timers):
+        # Reuse the oldest sector and start it with a snapshot of every
+        # timer, so the newest sector alone is enough to restore from.
+        self._sector = (self._sector + 1) % self._sectors
+        self._flash.ioctl(6, self._sector)
+        self._next = 0
+        for index in range(min(len(timers), self._slots)):
+            timer = timers[index]
+            self._write(index, timer.remaining_ms(), timer.duration_ms // 1000, timer.running)
+
+    def _write(self, index, remaining_ms, duration_s, running):
+        record = self._record
+        struct.pack_into(_RECORD, record, 0, self._seq, remaining_ms, duration_s, index,
+                         _FLAG_RUNNING if running else 0, 0)
+        struct.pack_into('<I', record, 12, binascii.crc32(memoryview(record)[:12]))
+        self._page[:RECORD_SIZE] = record
+        self._flash.writeblocks(self._sector, self._page, self._next * self._slot_size)
+        self._written[index] = (remaining_ms, duration_s, running, time.ticks_ms())
+        self._seq += 1
+        self._next += 1
+        self.records_written += 1
+
+    def _read(self, sector, slot):
+        record = self._record
+        self._flash.readblocks(sector, record, slot * self._slot_size)
+        fields = struct.unpack(_RECORD, record)
+        if binascii.crc32(memoryview(record)[:12]) != fields[5]:
+            return None
+        return fields
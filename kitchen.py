@@ -0,0 +1,1524 @@
+from machine import Pin, SPI, PWM, ADC
+import machine
+import micropython
+import framebuf
+import time
+from array import array
+import heapq
+import _thread
+from rotary_irq import RotaryIRQ
+import assets
+from profiler import STAGE_DISPLAY, STAGE_FRAME, STAGE_ROTARY, STAGE_SCREEN, STAGE_TIMER
+
+C_WHITE = 0xffff
+C_BLACK = 0x0000
+
+# C_ONE = 0xE446
+C_ONE = 0xE589
+C_TWO = 0xE0D9
+C_THREE = 0x1A3C
+C_FOUR = 0x4CD6
+C_FIVE = 0xDF55
+
+COMPACT_ROWS = 4
+
+MAX_ALARM_IN = 12 * 60 * 60
+
+# Rotary acceleration curve: (longest gap to the previous detent in ms,
+# detents it counts for), shortest gap first. Slower turns, and the first
+# detent of a turn, count as a single detent.
+ROTARY_ACCELERATION = (
+    (40, 30),
+    (80, 10),
+    (150, 3),
+)
+
+
+# SH1107 set-up, sent as one command transfer.
+_INIT_SEQUENCE = const(
+    b'\xae'          # display off
+    b'\x00\x10'      # column address 0
+    b'\xb0'          # page address 0
+    b'\xdc\x00'      # display start line 0
+    b'\x81\x6f'      # contrast, OLED.CONTRAST
+    b'\x21'          # vertical memory addressing
+    b'\xa0'          # segment remap off
+    b'\xc0'          # COM scan direction normal
+    b'\xa4'          # display follows RAM
+    b'\xa6'          # not inverted
+    b'\xa8\x3f'      # multiplex ratio: duty 1/64
+    b'\xd3\x60'      # display offset
+    b'\xd5\x41'      # oscillator division
+    b'\xd9\x22'      # pre-charge period
+    b'\xdb\x35'      # VCOMH
+    b'\xad\x8a'      # DC-DC on
+    b'\xaf'          # display on
+)
+
+
+class _Unlocked:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_UNLOCKED = _Unlocked()
+
+
+class OLED(framebuf.FrameBuffer):
+    CONTRAST = 0x6f
+
+    def __init__(self, spi=None):
+        dc = 8
+        rst = 12
+        mosi = 11
+        sck = 10
+        cs = 9
+
+        self.width = 128
+        self.height = 64
+
+        self.cs = Pin(cs, Pin.OUT)
+        self.rst = Pin(rst, Pin.OUT)
+
+        self.cs(1)
+        if spi is None:
+            spi = SPI(1, 20000_000, polarity=0, phase=0, sck=Pin(sck), mosi=Pin(mosi), miso=None)
+        self.spi = spi
+        self.dc = Pin(dc, Pin.OUT)
+        self.dc(1)
+        self.buffer = bytearray(self.height * self.width // 8)
+        super().__init__(self.buffer, self.width, self.height, framebuf.MONO_HMSB)
+
+        # The panel is mounted rotated: every 16-byte framebuffer row is sent
+        # as one display column, starting from the last one.
+        self.bulk_flush = True
+        self._cmd = bytearray(1)
+        self._data = bytearray(1)
+        self._contrast_cmd = bytearray((0x81, self.CONTRAST))
+        buffer = memoryview(self.buffer)
+        self._columns = [buffer[page * 16:page * 16 + 16] for page in range(0, 64)]
+        self._column_cmds = [bytes((0x00 + ((63 - page) & 0x0f), 0x10 + ((63 - page) >> 4)))
+                             for page in range(0, 64)]
+
+        # Copy of what the panel currently shows, so show() only sends the
+        # columns that differ from it.
+        self._shadow = bytearray(len(self.buffer))
+        shadow = memoryview(self._shadow)
+        self._shadow_columns = [shadow[page * 16:page * 16 + 16] for page in range(0, 64)]
+        self._full_refresh = True
+        self.columns_sent = 0
+        # Rows the next show() compares and sends; see flush_rows().
+        self._flush_lo = 0
+        self._flush_hi = 64
+
+        # Set by start_worker(): the front buffer the worker streams from,
+        # filled from self.buffer on every show().
+        self._front = None
+        self._worker_running = False
+        # Set by start_dma().
+        self._dma = None
+        # ticks_ms when the first frame reached the panel, which is also the
+        # time since reset as ticks_ms starts at zero on boot.
+        self.first_frame_ms = None
+
+        self.init_display()
+
+        self.white = 0xffff
+        self.black = 0x0000
+
+    def write_cmd(self, cmd):
+        self._cmd[0] = cmd
+        self._write_run(0, self._cmd)
+
+    def write_data(self, buf):
+        self._data[0] = buf
+        self._write_run(1, self._data)
+
+    def _write_run(self, dc, buf):
+        self.cs(1)
+        self.dc(dc)
+        self.cs(0)
+        self.spi.write(buf)
+        self.cs(1)
+
+    def init_display(self):
+        """Initialize display"""
+        self.rst(1)
+        time.sleep_ms(1)
+        self.rst(0)
+        time.sleep_ms(10)
+        self.rst(1)
+        self._write_run(0, _INIT_SEQUENCE)
+
+    def show(self):
+        lo = self._flush_lo
+        hi = self._flush_hi
+        self._flush_lo = 0
+        self._flush_hi = 64
+        if self._dma is not None:
+            self._show_dma(lo, hi)
+        elif self._worker_running:
+            self._hand_over(lo, hi)
+        else:
+            self._flush(self._columns, lo, hi)
+
+    def flush_rows(self, lo, hi):
+        """Limit the next show() to framebuffer rows lo..hi-1; lo == hi sends nothing."""
+        self._flush_lo = lo
+        self._flush_hi = hi
+
+    def invalidate(self):
+        # The worker reads and clears the flag while it flushes.
+        with self.hold_bus():
+            self._full_refresh = True
+
+    def contrast(self, value):
+        self._contrast_cmd[1] = value
+        with self.hold_bus():
+            self._write_run(0, self._contrast_cmd)
+
+    def hold_bus(self):
+        """A context that keeps the flush worker off the SPI bus; does nothing without one.
+
+        With a DMA backend the transfer in flight is finished first.
+        """
+        if self._dma is not None:
+            self._dma.wait()
+        return self._front_lock if self._worker_running else _UNLOCKED
+
+    def start_dma(self, backend):
+        """Send frames through backend, a panel_dma.DMAFlush, instead of blocking writes.
+
+        show() copies the changed run of rows into the backend's buffer in
+        panel column order, starts the transfer and returns, so drawing
+        the next frame overlaps with it. Use this or start_worker().
+        """
+        buffer = memoryview(backend.buffer)
+        self._dma_columns = [buffer[i * 16:i * 16 + 16] for i in range(0, 64)]
+        # Page 0 and the panel column of each framebuffer row: where a run
+        # that ends with that row starts.
+        self._run_cmds = [bytes((0xb0,)) + cmd for cmd in self._column_cmds]
+        self._dma = backend
+
+    def start_worker(self, thread=_thread):
+        """Stream frames to the panel from a second thread (core 1 on the RP2040).
+
+        Drawing keeps going to self.buffer, the back buffer. show() copies it
+        to a front buffer and wakes the worker, so the next frame can be
+        prepared while this one is on the bus. The framebuffer methods are
+        bound to self.buffer, which is why this swaps by copying rather than
+        by exchanging buffers.
+        """
+        self._front = bytearray(len(self.buffer))
+        front = memoryview(self._front)
+        self._front_columns = [front[page * 16:page * 16 + 16] for page in range(0, 64)]
+        # Rows of the front buffer not sent yet; grows while the worker lags.
+        self._front_lo = 64
+        self._front_hi = 0
+        # _frame_ready is held while there is no new frame; _front_lock while
+        # the front buffer is being read or written.
+        self._frame_ready = thread.allocate_lock()
+        self._frame_ready.acquire()
+        self._front_lock = thread.allocate_lock()
+        self._worker_running = True
+        thread.start_new_thread(self._worker, ())
+
+    def stop_worker(self):
+        if self._worker_running:
+            self._worker_running = False
+            # A free lock means a frame is still waiting; the worker wakes
+            # for it and sees it has to stop either way.
+            if self._frame_ready.locked():
+                self._frame_ready.release()
+
+    def _hand_over(self, lo, hi):
+        with self._front_lock:
+            self._front[:] = self.buffer
+            if lo < self._front_lo:
+                self._front_lo = lo
+            if hi > self._front_hi:
+                self._front_hi = hi
+        # Only this side releases, so a lock that is already free just means
+        # the worker has not picked up the previous frame yet and will send
+        # this one instead.
+        if self._frame_ready.locked():
+            self._frame_ready.release()
+
+    def _worker(self):
+        while True:
+            self._frame_ready.acquire()
+            if not self._worker_running:
+                break
+            with self._front_lock:
+                self._flush(self._front_columns, self._front_lo, self._front_hi)
+                self._front_lo = 64
+                self._front_hi = 0
+
+    def _flush(self, columns, lo=0, hi=64):
+        if self.bulk_flush:
+            self._show_bulk(columns, lo, hi)
+        else:
+            self._show_bytewise(columns)
+        if self.first_frame_ms is None:
+            self.first_frame_ms = time.ticks_ms()
+
+    def _show_bulk(self, columns, lo, hi):
+        shadow_columns = self._shadow_columns
+        full = self._full_refresh
+        self._full_refresh = False
+        if full:
+            lo = 0
+            hi = 64
+        sent = 0
+        for page in range(lo, hi):
+            column = columns[page]
+            if full or column != shadow_columns[page]:
+                if sent == 0:
+                    self.write_cmd(0xb0)
+                self._write_run(0, self._column_cmds[page])
+                self._write_run(1, column)
+                shadow_columns[page][:] = column
+                sent += 1
+        self.columns_sent = sent
+
+    def _show_dma(self, lo, hi):
+        dma = self._dma
+        dma.wait()
+        columns = self._columns
+        shadow_columns = self._shadow_columns
+        if self._full_refresh:
+            self._full_refresh = False
+            lo = 0
+            hi = 64
+        else:
+            # Rows in between that did not change are sent again; that
+            # costs bus time only, not CPU time.
+            while lo < hi and columns[lo] == shadow_columns[lo]:
+                lo += 1
+            while hi > lo and columns[hi - 1] == shadow_columns[hi - 1]:
+                hi -= 1
+        self.columns_sent = hi - lo
+        if lo == hi:
+            return
+        dma_columns = self._dma_columns
+        for i in range(hi - lo):
+            column = columns[hi - 1 - i]
+            dma_columns[i][:] = column
+            shadow_columns[hi - 1 - i][:] = column
+        dma.start(self._run_cmds[hi - 1], (hi - lo) * 16)
+        if self.first_frame_ms is None:
+            self.first_frame_ms = time.ticks_ms()
+
+    def _show_bytewise(self, columns):
+        self.write_cmd(0xb0)
+        for page in range(0, 64):
+            column = 63 - page
+            self.write_cmd(0x00 + (column & 0x0f))
+            self.write_cmd(0x10 + (column >> 4))
+            for num in range(0, 16):
+                self.write_data(columns[page][num])
+        self._full_refresh = True
+
+
+def compile_pattern(steps):
+    """Pack (freq_hz, duty_u16, duration_ms) steps into a flat array; freq 0 is a rest."""
+    pattern = array('H')
+    for freq, duty, duration_ms in steps:
+        pattern.append(freq)
+        pattern.append(duty)
+        pattern.append(duration_ms)
+    return pattern
+
+
+MELODIES = {
+    'beep': compile_pattern((
+        (800, 32768, 500),
+        (0, 0, 500))),
+    'double': compile_pattern((
+        (1000, 32768, 120),
+        (0, 0, 80),
+        (1000, 32768, 120),
+        (0, 0, 680))),
+    'rising': compile_pattern((
+        (660, 32768, 150),
+        (880, 32768, 150),
+        (1100, 32768, 150),
+        (0, 0, 550))),
+}
+# The order the protocol numbers them in; MicroPython dicts keep none.
+MELODY_NAMES = ('beep', 'double', 'rising')
+
+
+class Beep:
+    """Plays an alarm melody from a one-shot machine.Timer, one step at a time.
+
+    Each step re-arms the timer for its own duration, so the rhythm does not
+    depend on how often the main loop runs. With escalate, the first rounds
+    play quieter and every round after that one step louder, up to full
+    duty. While silent nothing is armed at all.
+    """
+
+    ESCALATION_STEPS = 3
+
+    def __init__(self, melody='beep', escalate=True):
+        self._pwm = PWM(Pin(5))
+        self._timer = machine.Timer()
+        self._pattern = MELODIES[melody]
+        self._escalate = escalate
+        self._enabled = False
+        self._step = 0
+        self._duty_shift = 0
+        # Bound once: the timer callback must not allocate.
+        self._on_step_ref = self._on_step
+
+    @property
+    def is_enabled(self):
+        return self._enabled
+
+    def select(self, melody):
+        # Back to the first step before the pattern changes, so a step the
+        # timer plays in between still falls inside either pattern.
+        self._step = 0
+        self._pattern = MELODIES[melody]
+
+    def enabled(self, value):
+        if value == self._enabled:
+            return
+        self._enabled = value
+        if value:
+            self._step = 0
+            self._duty_shift = self.ESCALATION_STEPS if self._escalate else 0
+            self._play_step()
+        else:
+            self._timer.deinit()
+            self._pwm.deinit()
+
+    def _play_step(self):
+        i = self._step * 3
+        freq = self._pattern[i]
+        if freq:
+            self._pwm.freq(freq)
+            self._pwm.duty_u16(self._pattern[i + 1] >> self._duty_shift)
+        else:
+            self._pwm.duty_u16(0)
+        self._timer.init(mode=machine.Timer.ONE_SHOT, period=self._pattern[i + 2], callback=self._on_step_ref)
+
+    def _on_step(self, _):
+        if not self._enabled:
+            return
+        self._step += 1
+        if self._step * 3 >= len(self._pattern):
+            self._step = 0
+            if self._duty_shift:
+                self._duty_shift -= 1
+        self._play_step()
+
+
+class Timer:
+    def __init__(self, on_alarm, on_alarm_off, name=None):
+        self.name = name
+        self.running = False
+        self.on_alarm = on_alarm
+        self.on_alarm_off = on_alarm_off
+        self.on_schedule = None
+        self._schedule_seq = 0
+        self._in_alarm = False
+        # While running the countdown is kept as a ticks_ms deadline, while
+        # paused as the milliseconds that were left.
+        self._deadline = 0
+        self._remaining_ms = 0
+        # The length the timer was last set to, for progress display.
+        self.duration_ms = 0
+
+    def current(self):
+        self.tick()
+
+        minutes, seconds = divmod(self.alarm_in, 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+    def format_into(self, buf):
+        """Write the time as "h:mm:ss" ASCII into buf, zero-padding the rest.
+
+        The allocation-free counterpart of current() for the render path;
+        buf must hold at least 8 bytes.
+        """
+        self.tick()
+        seconds = self.alarm_in
+        hours = seconds // 3600 % 100
+        minutes = seconds // 60 % 60
+        seconds = seconds % 60
+        i = 0
+        if hours >= 10:
+            buf[0] = 48 + hours // 10
+            i = 1
+        buf[i] = 48 + hours % 10
+        buf[i + 1] = 58
+        buf[i + 2] = 48 + minutes // 10
+        buf[i + 3] = 48 + minutes % 10
+        buf[i + 4] = 58
+        buf[i + 5] = 48 + seconds // 10
+        buf[i + 6] = 48 + seconds % 10
+        for j in range(i + 7, len(buf)):
+            buf[j] = 0
+
+    def tick(self):
+        if self.running and time.ticks_diff(self._deadline, time.ticks_ms()) <= 0:
+            self._remaining_ms = 0
+            self.running = False
+            self.in_alarm = True
+
+    def remaining_ms(self):
+        if self.running:
+            return max(0, time.ticks_diff(self._deadline, time.ticks_ms()))
+        return self._remaining_ms
+
+    def ms_to_next_change(self):
+        # The display rounds up, so it changes whenever the remaining time
+        # crosses a whole second; the last crossing is the deadline itself.
+        remaining = self.remaining_ms()
+        return remaining % 1000 or min(remaining, 1000)
+
+    @property
+    def alarm_in(self):
+        return (self.remaining_ms() + 999) // 1000
+
+    @alarm_in.setter
+    def alarm_in(self, seconds):
+        self.duration_ms = max(0, seconds * 1000)
+        self._set_remaining_ms(seconds * 1000)
+
+    def inc(self, seconds):
+        self._set_remaining_ms(self.remaining_ms() + seconds * 1000)
+        self.duration_ms = max(self.duration_ms, self.remaining_ms())
+        if self.remaining_ms() == 0 and not self._in_alarm:
+            self.running = False
+            self.in_alarm = True
+
+    def restore(self, remaining_ms, duration_ms, running):
+        """Put back a state read from the journal."""
+        self.duration_ms = duration_ms
+        self.running = False
+        self._set_remaining_ms(remaining_ms)
+        if running:
+            self.start()
+        else:
+            self._rescheduled()
+
+    def inc_with_round(self, seconds):
+        self.alarm_in = max(0, self.alarm_in + seconds - (self.alarm_in % 60))
+
+    @property
+    def in_alarm(self):
+        return self._in_alarm
+
+    @in_alarm.setter
+    def in_alarm(self, value):
+        if self._in_alarm != value:
+            if self.on_alarm is not None:
+                if value:
+                    self.on_alarm(self)
+                else:
+                    self.on_alarm_off(self)
+        self._in_alarm = value
+
+    def start(self):
+        self._deadline = time.ticks_add(time.ticks_ms(), self._remaining_ms)
+        self.running = True
+        self._rescheduled()
+
+    def pause(self):
+        self._remaining_ms = self.remaining_ms()
+        self.running = False
+        self._rescheduled()
+
+    def toggle(self):
+        if self.running:
+            self.pause()
+        else:
+            self.start()
+
+    def _set_remaining_ms(self, ms):
+        ms = max(0, ms)
+        if self.running:
+            self._deadline = time.ticks_add(time.ticks_ms(), ms)
+            self._rescheduled()
+        else:
+            self._remaining_ms = ms
+
+    def _rescheduled(self):
+        if self.on_schedule:
+            self.on_schedule(self)
+
+
+class TimerBank:
+    """Named timers whose expiries are kept in a heap ordered by deadline.
+
+    Only the earliest deadline is ever looked at, so checking for expiry
+    costs O(log N) per event instead of polling every timer every frame.
+    A timer that is paused or re-armed leaves its old entry behind; stale
+    entries are recognised by their sequence number and dropped when they
+    reach the top, and the heap is rebuilt if they pile up.
+    """
+
+    def __init__(self, on_alarm, on_alarm_off):
+        self.on_alarm = on_alarm
+        self.on_alarm_off = on_alarm_off
+        self.selected = 0
+        self._timers = []
+        self._heap = []
+        self._seq = 0
+        self._alarms = 0
+        # Timers that have run out so far, for whoever needs to notice one.
+        self.expired = 0
+        # Heap keys are ticks_diff() offsets from this epoch, which keeps them
+        # ordered across a ticks_ms wrap; it is moved forward whenever the heap
+        # drains.
+        self._epoch = time.ticks_ms()
+
+    def __len__(self):
+        return len(self._timers)
+
+    def __getitem__(self, index):
+        return self._timers[index]
+
+    def add(self, name=None) -> Timer:
+        timer = Timer(on_alarm=self._on_timer_alarm, on_alarm_off=self._on_timer_alarm_off, name=name)
+        timer.on_schedule = self._schedule
+        self._timers.append(timer)
+        return timer
+
+    @property
+    def selected_timer(self) -> Timer:
+        return self._timers[self.selected]
+
+    def select(self, index):
+        self.selected = index % len(self._timers)
+
+    @property
+    def in_alarm(self):
+        return self._alarms > 0
+
+    def clear_alarms(self):
+        for timer in self._timers:
+            timer.in_alarm = False
+
+    def tick(self):
+        heap = self._heap
+        now = time.ticks_diff(time.ticks_ms(), self._epoch)
+        while heap and heap[0][0] <= now:
+            _, seq, timer = heapq.heappop(heap)
+            if timer.running and timer._schedule_seq == seq:
+                timer.tick()
+        if not heap:
+            self._epoch = time.ticks_ms()
+
+    def next_expiry_ms(self):
+        heap = self._heap
+        while heap and not self._is_live(heap[0]):
+            heapq.heappop(heap)
+        if not heap:
+            return None
+        return max(0, heap[0][0] - time.ticks_diff(time.ticks_ms(), self._epoch))
+
+    def _schedule(self, timer):
+        self._seq += 1
+        timer._schedule_seq = self._seq
+        if not timer.running:
+            return
+        if len(self._heap) > 2 * len(self._timers) + 8:
+            self._heap = [entry for entry in self._heap if self._is_live(entry)]
+            heapq.heapify(self._heap)
+        key = time.ticks_diff(timer._deadline, self._epoch)
+        heapq.heappush(self._heap, (key, self._seq, timer))
+
+    def _is_live(self, entry):
+        timer = entry[2]
+        return timer.running and timer._schedule_seq == entry[1]
+
+    def _on_timer_alarm(self, timer):
+        self.expired += 1
+        self._alarms += 1
+        if self._alarms == 1 and self.on_alarm:
+            self.on_alarm(timer)
+
+    def _on_timer_alarm_off(self, timer):
+        self._alarms -= 1
+        if self._alarms == 0 and self.on_alarm_off:
+            self.on_alarm_off(timer)
+
+
+class AnimationClock:
+    """One time base for everything that blinks.
+
+    tick() samples ticks_ms once per frame; every Blinking derives its phase
+    from that sample as (now - epoch) % period, so all of them stay in step
+    and none reads the clock on its own.
+    """
+
+    # Rebase the epoch well before ticks_diff stops being meaningful.
+    REBASE_MS = 1 << 28
+
+    def __init__(self):
+        self._epoch = time.ticks_ms()
+        self._blinks = []
+        self._cycle = 1
+        self.now = 0
+
+    def add(self, blinking):
+        self._blinks.append(blinking)
+        self._cycle = _lcm(self._cycle, blinking.cycle_ms)
+
+    def tick(self):
+        now = time.ticks_diff(time.ticks_ms(), self._epoch)
+        if now >= self.REBASE_MS:
+            # Whole common cycles only, so no phase moves.
+            shift = now - now % self._cycle
+            self._epoch = time.ticks_add(self._epoch, shift)
+            now -= shift
+        self.now = now
+
+    def ms_to_next_change(self):
+        """Milliseconds until the next active Blinking flips, or None if none is active."""
+        now = time.ticks_diff(time.ticks_ms(), self._epoch)
+        ms = None
+        for blinking in self._blinks:
+            if blinking.active:
+                left = blinking.ms_to_next_change(now)
+                if ms is None or left < ms:
+                    ms = left
+        return ms
+
+
+def _lcm(a, b):
+    x, y = a, b
+    while y:
+        x, y = y, x % y
+    return a // x * b
+
+
+animation = AnimationClock()
+
+
+class Blinking:
+    def __init__(self, show_ms: int, hide_ms: int, clock: AnimationClock = animation):
+        self.show_ms = show_ms
+        self.cycle_ms = show_ms + hide_ms
+        # Only active blinks wake the display.
+        self.active = False
+        self._clock = clock
+        clock.add(self)
+
+    def can_show(self):
+        return self._clock.now % self.cycle_ms < self.show_ms
+
+    def ms_to_next_change(self, now=None):
+        if now is None:
+            now = self._clock.now
+        phase = now % self.cycle_ms
+        if phase < self.show_ms:
+            return self.show_ms - phase
+        return self.cycle_ms - phase
+
+
+class Icon:
+    def __init__(self, display: OLED, asset: str, is_blinking: bool = False):
+        asset = assets.get(asset)
+        self.bitmap = asset.source
+        self.display = display
+        self.width = asset.width
+        self.height = asset.height
+        self.is_blinking = is_blinking
+
+    def show(self, x, y):
+        self.display.blit(self.bitmap, x, y, 0)
+
+
+class PauseIcon(Icon):
+    def __init__(self, display: OLED):
+        super().__init__(display, 'pause')
+        self.blinking = Blinking(500, 500)
+
+    def show(self, x, y):
+        if self.blinking.can_show():
+            super().show(x, y)
+
+
+class SegmentedText(framebuf.FrameBuffer):
+    # Pre-rendered glyphs shared by all instances, keyed by
+    # (seg_size, seg_space); only the most recent GLYPH_SETS sizes are kept.
+    GLYPH_SETS = 2
+    _glyph_sets = {}
+    _glyph_order = []
+
+    def __init__(self, display: OLED):
+        super().__init__(display.buffer, display.width, display.height, framebuf.MONO_HMSB)
+        self.display = display
+        self.segments = {
+            "0": [[0, 2], [0, 1, 2, 3]],
+            "1": [[], [0, 1]],
+            "2": [[0, 1, 2], [1, 2]],
+            "3": [[0, 1, 2], [2, 3]],
+            "4": [[1], [0, 2, 3]],
+            "5": [[0, 1, 2], [0, 3]],
+            "6": [[0, 1, 2], [0, 1, 3]],
+            "7": [[0], [2, 3]],
+            "8": [[0, 1, 2], [0, 1, 2, 3]],
+            "9": [[0, 1, 2], [0, 2, 3]],
+            " ": [[], []],
+            "-": [[1], []]
+        }
+        self.seg_size = 15
+        self.seg_space = 6
+        self._glyph_size = None
+        self._glyph_space = None
+        self._glyph_set = None
+
+    def write(self, text, x: int, y: int, c: int):
+        # text may be a str or, allocation-free, a bytes-like object of ASCII
+        # codes; characters without a glyph, such as zero padding, are skipped.
+        if not c & 1:
+            # Glyphs are rendered in the "on" colour, so erasing draws directly.
+            self._draw(self, text, x, y, c)
+            return
+
+        glyphs = self._glyphs()
+        x_ = x
+        for i in range(len(text)):
+            code = text[i]
+            if not isinstance(code, int):
+                code = ord(code)
+            if code < 128:
+                glyph = glyphs[code]
+                if glyph is not None:
+                    bitmap, advance = glyph
+                    self.blit(bitmap, x_ - 1, y - 1, 0)
+                    x_ += advance
+
+    def _draw(self, target, text, x: int, y: int, c: int):
+        x_ = x
+        for i in range(len(text)):
+            s = text[i]
+            if isinstance(s, int):
+                s = chr(s)
+            if s in self.segments.keys():
+                [hor, ver] = self.segments[s]
+                self._hor_segments(target, x_, y, hor, c)
+                self._ver_segments(target, x_, y, ver, c)
+                x_ += self.seg_size + self.seg_space
+            elif s == ':':
+                third = self.seg_size // 3
+                target.fill_rect(x_, y + 2 * third, 2, 2, c)
+                target.fill_rect(x_, y + 4 * third, 2, 2, c)
+                x_ += self.seg_size // 2
+
+    def _glyphs(self):
+        if self._glyph_size == self.seg_size and self._glyph_space == self.seg_space:
+            return self._glyph_set
+
+        key = (self.seg_size, self.seg_space)
+        glyphs = SegmentedText._glyph_sets.get(key)
+        if glyphs is None:
+            glyphs = assets.glyph_set(self.seg_size, self.seg_space) or self._render_glyphs()
+            SegmentedText._glyph_sets[key] = glyphs
+            SegmentedText._glyph_order.append(key)
+            if len(SegmentedText._glyph_order) > SegmentedText.GLYPH_SETS:
+                del SegmentedText._glyph_sets[SegmentedText._glyph_order.pop(0)]
+
+        self._glyph_size = self.seg_size
+        self._glyph_space = self.seg_space
+        self._glyph_set = glyphs
+        return glyphs
+
+    def _render_glyphs(self):
+        # Sizes without pre-rendered glyphs in glyph_data are drawn into RAM.
+        glyphs = [None] * 128
+        for s in self.glyph_chars():
+            data, width, height, advance = self.render_glyph(s)
+            glyphs[ord(s)] = (framebuf.FrameBuffer(data, width, height, framebuf.MONO_HMSB), advance)
+        return glyphs
+
+    def glyph_chars(self):
+        return list(self.segments.keys()) + [':']
+
+    def glyph_width(self, s):
+        # Segment strokes reach one pixel left of the character origin and
+        # two past the last segment; the colon's dots are two pixels wide.
+        return 3 if s == ':' else self.seg_size + 3
+
+    def render_glyph(self, s):
+        """Draw one character; returns (bitmap bytes, width, height, advance)."""
+        # Segment strokes reach one pixel left of and above the character
+        # origin, so glyphs are drawn at (1, 1) and blitted back by one.
+        width = self.glyph_width(s)
+        if s == ':':
+            advance = self.seg_size // 2
+        else:
+            advance = self.seg_size + self.seg_space
+        height = 2 * self.seg_size + 3
+        data = bytearray((width + 7) // 8 * height)
+        self._draw(framebuf.FrameBuffer(data, width, height, framebuf.MONO_HMSB), s, 1, 1, 1)
+        return data, width, height, advance
+
+    def _hor_segments(self, target, x: int, y: int, segs: [int], c: int):
+        for seg in segs:
+            y_ = y + seg * self.seg_size
+            target.hline(x + 2, y_ - 1, self.seg_size - 3, c)
+            target.hline(x + 1, y_, self.seg_size - 1, c)
+            target.hline(x + 2, y_ + 1, self.seg_size - 3, c)
+
+    def _ver_segments(self, target, x: int, y: int, segs: [int], c: int):
+        for seg in segs:
+            seg_x, seg_y = divmod(seg, 2)
+            x_ = x + seg_x * self.seg_size
+            y_ = y + seg_y * self.seg_size
+            target.vline(x_ - 1, y_ + 2, self.seg_size - 3, c)
+            target.vline(x_, y_ + 1, self.seg_size - 1, c)
+            target.vline(x_ + 1, y_ + 2, self.seg_size - 3, c)
+
+
+KEY_CLICK = 0
+KEY_DOUBLE_CLICK = 1
+KEY_LONG_PRESS = 2
+KEY_GESTURES = ('click', 'double-click', 'long-press')
+
+# Key edges queued by the pin IRQ until the scheduled dispatch drains them.
+_KEY_SLOTS = const(8)
+
+
+class Key:
+    """Debounced push button that reports clicks, double-clicks and long presses.
+
+    The pin IRQ only stores the edge's ticks_ms and level in a ring and
+    schedules _dispatch. There an edge is accepted when it changes the
+    debounced level at least DEBOUNCE_MS after the previous accepted one;
+    bounces inside that window are dropped and the pin is sampled again
+    when it closes. One one-shot machine.Timer wakes the driver for the
+    settle check, the long-press threshold and the end of the double-click
+    window, so nothing polls. Gestures go to on_gesture(key, gesture);
+    on_event() follows every gesture and every accepted edge, so a press
+    counts as activity before its gesture is known.
+    """
+
+    DEBOUNCE_MS = 20
+    DOUBLE_CLICK_MS = 300
+    LONG_PRESS_MS = 800
+
+    def __init__(self, pin_num, on_gesture=None, active=0):
+        self.pin = Pin(pin_num, Pin.IN, Pin.PULL_UP)
+        self.on_gesture = on_gesture
+        self.on_event = None
+        self._active = active
+        self._edge_ms = array('L', [0] * _KEY_SLOTS)
+        self._edge_level = bytearray(_KEY_SLOTS)
+        self._edge_head = 0
+        self._edge_tail = 0
+        self._dispatch_pending = False
+        # Bound once here: creating the bound method inside the IRQ would allocate.
+        self._dispatch_ref = self._dispatch
+        self._timeout_ref = self._on_timeout
+        self.overflows = 0
+
+        self._timer = machine.Timer()
+        self._pressed = self.pin.value() == active
+        self._changed_at = time.ticks_ms()
+        self._unsettled = False
+        self._long_fired = False
+        self._clicks = 0
+        self.pin.irq(trigger=Pin.IRQ_FALLING | Pin.IRQ_RISING, handler=self._on_edge)
+
+    @property
+    def pressed(self):
+        return self._pressed
+
+    def _on_edge(self, pin):
+        head = self._edge_head
+        next_head = (head + 1) % _KEY_SLOTS
+        if next_head == self._edge_tail:
+            self.overflows += 1
+            return
+        self._edge_ms[head] = time.ticks_ms()
+        self._edge_level[head] = pin.value()
+        self._edge_head = next_head
+
+        if not self._dispatch_pending:
+            self._dispatch_pending = True
+            try:
+                micropython.schedule(self._dispatch_ref, 0)
+            except RuntimeError:
+                # Schedule queue full; the next edge tries again.
+                self._dispatch_pending = False
+
+    def _dispatch(self, _):
+        self._dispatch_pending = False
+        tail = self._edge_tail
+        while tail != self._edge_head:
+            ms = self._edge_ms[tail]
+            pressed = self._edge_level[tail] == self._active
+            tail = (tail + 1) % _KEY_SLOTS
+            self._edge_tail = tail
+            self._edge(pressed, ms)
+        self._rearm()
+
+    def _edge(self, pressed, ms):
+        if pressed == self._pressed:
+            return
+        if time.ticks_diff(ms, self._changed_at) < self.DEBOUNCE_MS:
+            # A bounce; where the contact ends up is checked once it settles.
+            self._unsettled = True
+            return
+        self._pressed = pressed
+        self._changed_at = ms
+        if self.on_event:
+            self.on_event()
+        if pressed:
+            self._long_fired = False
+        elif not self._long_fired:
+            self._clicks += 1
+            if self._clicks == 2:
+                self._clicks = 0
+                self._fire(KEY_DOUBLE_CLICK)
+
+    def _on_timeout(self, _):
+        now = time.ticks_ms()
+        since = time.ticks_diff(now, self._changed_at)
+        if self._unsettled and since >= self.DEBOUNCE_MS:
+            self._unsettled = False
+            self._edge(self.pin.value() == self._active, now)
+            since = time.ticks_diff(now, self._changed_at)
+        if self._pressed:
+            if not self._long_fired and since >= self.LONG_PRESS_MS:
+                self._long_fired = True
+                self._clicks = 0
+                self._fire(KEY_LONG_PRESS)
+        elif self._clicks and since >= self.DOUBLE_CLICK_MS:
+            self._clicks = 0
+            self._fire(KEY_CLICK)
+        self._rearm()
+
+    def _rearm(self):
+        # The earliest of the settle check, the long-press threshold and the
+        # end of the double-click window, if any of them is pending.
+        wait = None
+        if self._unsettled:
+            wait = self.DEBOUNCE_MS
+        if self._pressed and not self._long_fired:
+            wait = min(wait, self.LONG_PRESS_MS) if wait is not None else self.LONG_PRESS_MS
+        elif not self._pressed and self._clicks:
+            wait = min(wait, self.DOUBLE_CLICK_MS) if wait is not None else self.DOUBLE_CLICK_MS
+        if wait is None:
+            self._timer.deinit()
+            return
+        wait -= time.ticks_diff(time.ticks_ms(), self._changed_at)
+        self._timer.init(mode=machine.Timer.ONE_SHOT, period=max(1, wait), callback=self._timeout_ref)
+
+    def _fire(self, gesture):
+        if self.on_gesture:
+            self.on_gesture(self, gesture)
+        if self.on_event:
+            self.on_event()
+
+
+class Widget:
+    """A box on the panel that is cleared and redrawn only when invalidated."""
+
+    def __init__(self, x, y, width, height):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.dirty = True
+
+    def invalidate(self):
+        self.dirty = True
+
+    def draw(self, display):
+        pass
+
+
+class TextWidget(Widget):
+    """Up to length characters of segmented text, bound to a slice of a text buffer."""
+
+    def __init__(self, text: SegmentedText, x, y, length):
+        super().__init__(0, y - 1, 0, 2 * text.seg_size + 3)
+        self._text = text
+        self._value = bytearray(2)
+        self.place(x, length)
+
+    def place(self, x, length):
+        # Segment strokes reach one pixel left of and above the origin and
+        # two past the last segment.
+        text = self._text
+        self._origin_x = x
+        self.x = x - 1
+        self.width = (length - 1) * (text.seg_size + text.seg_space) + text.seg_size + 3
+        if len(self._value) != length:
+            self._value = bytearray(length)
+        self.dirty = True
+
+    def bind(self, value, start=0):
+        own = self._value
+        for i in range(len(own)):
+            j = start + i
+            code = value[j] if j < len(value) else 0
+            if not isinstance(code, int):
+                code = ord(code)
+            if own[i] != code:
+                own[i] = code
+                self.dirty = True
+
+    def draw(self, display):
+        self._text.write(self._value, self._origin_x, self.y + 1, 0xFF)
+
+
+class ColonWidget(TextWidget):
+    """A colon between digit groups, boxed to its own glyph.
+
+    A one-character TextWidget is a digit wide and would reach into the
+    group after it, which clearing the colon would then erase.
+    """
+
+    def __init__(self, text: SegmentedText, x, y):
+        super().__init__(text, x, y, 1)
+        self.bind(':')
+
+    def place(self, x, length=1):
+        super().place(x, 1)
+        self.width = self._text.glyph_width(':')
+
+
+class BoxWidget(Widget):
+    """A filled rectangle shown while its bound flag is set."""
+
+    def __init__(self, x, y, width, height):
+        super().__init__(x, y, width, height)
+        self._visible = False
+
+    def bind(self, visible):
+        if visible != self._visible:
+            self._visible = visible
+            self.dirty = True
+
+    def draw(self, display):
+        if self._visible:
+            display.fill_rect(self.x, self.y, self.width, self.height, 0xFF)
+
+
+class IconWidget(BoxWidget):
+    def __init__(self, icon: Icon, x, y):
+        super().__init__(x, y, icon.width, icon.height)
+        self._icon = icon
+
+    def draw(self, display):
+        if self._visible:
+            display.blit(self._icon.bitmap, self.x, self.y, 0)
+
+
+class ProgressBar(Widget):
+    """Fills from the left in proportion to the bound remaining/total time."""
+
+    def __init__(self, x, y, width, height):
+        super().__init__(x, y, width, height)
+        self._filled = 0
+
+    def bind(self, remaining, total):
+        filled = self.width * remaining // total if total > 0 else 0
+        if filled != self._filled:
+            self._filled = filled
+            self.dirty = True
+
+    def draw(self, display):
+        if self._filled:
+            display.fill_rect(self.x, self.y, self._filled, self.height, 0xFF)
+
+
+class Screen:
+    def __init__(self, *, display: OLED):
+        self._display = display
+
+
+class ScreenPresenter(Screen):
+    """Draws the timers from a small retained widget tree.
+
+    Every show() binds the current values to the widgets of the active
+    layout; only widgets whose value changed clear and redraw their box, and
+    the rows those boxes cover are all the panel is sent.
+    """
+
+    def __init__(self, *, color: int, display: OLED):
+        super().__init__(display=display)
+        self._color = color
+        self._is_paused = False
+        self._segmented_text = SegmentedText(self._display)
+        self._pause_icon = PauseIcon(self._display)
+        self._text = ''
+        self._compact_text = SegmentedText(self._display)
+        self._compact_text.seg_size = 5
+        self._compact_text.seg_space = 3
+        self._rows = None
+        self._row_count = 0
+        self._selected_row = 0
+        self._remaining_ms = 0
+        self._duration_ms = 0
+
+        # One timer: h:mm:ss as digit groups and colons, the pause icon and a
+        # progress bar along the bottom edge.
+        big = self._segmented_text
+        self._hours = TextWidget(big, 8, 25, 1)
+        self._colons = (ColonWidget(big, 8, 25), ColonWidget(big, 8, 25))
+        self._minutes = TextWidget(big, 8, 25, 2)
+        self._seconds = TextWidget(big, 8, 25, 2)
+        self._face_icon = IconWidget(self._pause_icon, 3, 3)
+        self._progress = ProgressBar(8, 60, 112, 3)
+        self._hour_digits = 0
+        self._face = [self._hours, self._colons[0], self._minutes, self._colons[1], self._seconds,
+                      self._face_icon, self._progress]
+
+        # Up to COMPACT_ROWS small timers, one per 16 px row, with a bar
+        # marking the selected one.
+        self._row_texts = []
+        self._row_bars = []
+        self._row_icons = []
+        for i in range(COMPACT_ROWS):
+            y = i * 16 + 2
+            self._row_texts.append(TextWidget(self._compact_text, 10, y, 8))
+            self._row_bars.append(BoxWidget(2, y + 3, 3, 7))
+            self._row_icons.append(IconWidget(self._pause_icon, 116, y + 1))
+        self._list = self._row_texts + self._row_bars + self._row_icons
+
+        self._widgets = None
+
+    def show(self):
+        display = self._display
+        widgets = self._list if self._row_count else self._face
+        full = widgets is not self._widgets
+        if full:
+            self._widgets = widgets
+            display.fill(self._color)
+            for widget in widgets:
+                widget.invalidate()
+
+        if self._row_count:
+            self._bind_rows()
+        else:
+            self._bind_face()
+
+        lo = 64
+        hi = 0
+        for widget in widgets:
+            if widget.dirty:
+                widget.dirty = False
+                display.fill_rect(widget.x, widget.y, widget.width, widget.height, self._color)
+                widget.draw(display)
+                if widget.y < lo:
+                    lo = widget.y
+                if widget.y + widget.height > hi:
+                    hi = widget.y + widget.height
+        if full:
+            display.flush_rows(0, 64)
+        elif lo < hi:
+            display.flush_rows(max(0, lo), min(64, hi))
+        else:
+            display.flush_rows(0, 0)
+
+    def _bind_face(self):
+        text = self._text
+        digits = 0
+        while digits < len(text) and text[digits] not in (58, ':'):
+            digits += 1
+        if digits != self._hour_digits:
+            # Hours went to or from two digits: everything shifts.
+            self._hour_digits = digits
+            self._layout_face(digits)
+        self._hours.bind(text)
+        self._minutes.bind(text, digits + 1)
+        self._seconds.bind(text, digits + 4)
+        self._face_icon.bind(self._is_paused and self._pause_icon.blinking.can_show())
+        self._progress.bind(self._remaining_ms, self._duration_ms)
+
+    def _layout_face(self, hour_digits):
+        self._display.fill_rect(0, self._hours.y, self._display.width, self._hours.height, self._color)
+        big = self._segmented_text
+        advance = big.seg_size + big.seg_space
+        colon_advance = big.seg_size // 2
+        x = 8
+        self._hours.place(x, max(1, hour_digits))
+        x += hour_digits * advance
+        for colon, group in ((self._colons[0], self._minutes), (self._colons[1], self._seconds)):
+            colon.place(x)
+            group.place(x + colon_advance, 2)
+            x += colon_advance + 2 * advance
+
+    def _bind_rows(self):
+        blink = self._is_paused and self._pause_icon.blinking.can_show()
+        for i in range(COMPACT_ROWS):
+            if i < self._row_count:
+                self._row_texts[i].bind(self._rows[i])
+            else:
+                self._row_texts[i].bind(b'')
+            selected = i == self._selected_row and i < self._row_count
+            self._row_bars[i].bind(selected)
+            self._row_icons[i].bind(selected and blink)
+
+    def invalidate(self):
+        """Redraw everything on the next show(), e.g. after the panel lost its contents."""
+        self._widgets = None
+    
+    def set_paused(self, value):
+        self._is_paused = value
+        self._pause_icon.blinking.active = value
+        
+    def set_text(self, value):
+        self._text = value
+        self._row_count = 0
+
+    def set_rows(self, rows, count, selected):
+        self._rows = rows
+        self._row_count = count
+        self._selected_row = selected
+
+    def set_progress(self, remaining_ms, duration_ms):
+        self._remaining_ms = remaining_ms
+        self._duration_ms = duration_ms
+
+    def ms_to_next_change(self):
+        return animation.ms_to_next_change()
+
+
+class MockScreenPresenter(object):
+    def __init__(self, *, color: int, display: OLED):
+        self._is_paused = False
+        self._text = ''
+        self._rows = None
+        self._row_count = 0
+        self._selected_row = 0
+
+    def show(self):
+        if self._row_count:
+            rows = [_as_text(self._rows[i]) for i in range(self._row_count)]
+            print(f"Rows = {rows} Selected = {self._selected_row}")
+        else:
+            print(f"Text = {_as_text(self._text)}")
+        print(f"Is Paused = {self._is_paused}")
+    
+    def set_paused(self, value):
+        self._is_paused = value
+        
+    def set_text(self, value):
+        self._text = value
+        self._row_count = 0
+
+    def set_rows(self, rows, count, selected):
+        self._rows = rows
+        self._row_count = count
+        self._selected_row = selected
+
+    def set_progress(self, remaining_ms, duration_ms):
+        pass
+
+    def ms_to_next_change(self):
+        return None
+
+
+def _as_text(value):
+    if isinstance(value, str):
+        return value
+    return bytes(b for b in value if b).decode()
+
+
+class State:                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                   
+    def __init__(self, *, pause_icon: PauseIcon, segmented_text: SegmentedText, display: OLED, rotary: RotaryIRQ, timer_count: int = 1):
+        self._display = display
+        self._beep = Beep()
+        self._rotary = rotary
+        self._timers = TimerBank(
+            on_alarm=lambda _: self._beep.enabled(True),
+            on_alarm_off=lambda _: self._beep.enabled(False))
+        for i in range(timer_count):
+            self._timers.add(str(i + 1))
+        # Text buffers the timers are formatted into on every frame.
+        self._text = bytearray(8)
+        self._row_text = [bytearray(8) for _ in range(COMPACT_ROWS)]
+#         self._screen = ScreenPresenter(color=0x00, display=display)
+        self._screen = ScreenPresenter(color=0x00, display=display)
+        
+        self._key = Key(20)
+        self._key.on_gesture = self._on_key_gesture
+        self._rotary.on_changed = self._on_rotary_changed
+        self.instrument(None)
+
+    def instrument(self, profiler):
+        """Route each stage through profiler's timed wrappers, or back to the plain calls for None."""
+        self.tick_timers = self._timers.tick
+        self.tick_rotary = self._rotary.tick
+        self.render = self._render
+        self.flush = self._display.show
+        self.frame = self._frame
+        if profiler is not None:
+            profiler.rotary = self._rotary
+            self.tick_timers = profiler.wrap(STAGE_TIMER, self.tick_timers)
+            self.tick_rotary = profiler.wrap(STAGE_ROTARY, self.tick_rotary)
+            self.render = profiler.wrap(STAGE_SCREEN, self.render)
+            self.flush = profiler.wrap(STAGE_DISPLAY, self.flush)
+            self.frame = profiler.wrap(STAGE_FRAME, self.frame)
+
+    def _on_key_gesture(self, source, gesture):
+        # Any gesture silences an alarm. Otherwise a click starts or pauses
+        # the selected timer, a long press stops it and puts back the time it
+        # was set to, and a double-click selects the next timer.
+        if self._timers.in_alarm:
+            self._timers.clear_alarms()
+        elif gesture == KEY_CLICK:
+            self.timer.toggle()
+            self._screen.set_paused(not self.timer.running)
+        elif gesture == KEY_LONG_PRESS:
+            timer = self.timer
+            timer.pause()
+            timer.alarm_in = timer.duration_ms // 1000
+            self._screen.set_paused(True)
+        elif gesture == KEY_DOUBLE_CLICK:
+            self.select_timer((self._timers.selected + 1) % len(self._timers))
+
+    def _on_rotary_changed(self, source: 'Rotary', steps):
+        # 10 s per detent below a minute, whole minutes above it; the time is
+        # first snapped to that grid so a step always lands on a round value.
+        timer = self.timer
+        alarm_in = timer.alarm_in
+        if alarm_in < 60 or (alarm_in == 60 and steps < 0):
+            step = 10
+        else:
+            step = 60
+        remainder = alarm_in % step
+        if steps < 0 and remainder:
+            steps += 1
+        timer.alarm_in = max(0, min(MAX_ALARM_IN, alarm_in - remainder + steps * step))
+            
+        timer.in_alarm = False
+
+    @property
+    def timer(self):
+        return self._timers.selected_timer
+
+    @property
+    def timers(self):
+        return self._timers
+
+    def select_timer(self, index):
+        self._timers.select(index)
+        self._screen.set_paused(not self.timer.running)
+
+    @property
+    def beep(self):
+        return self._beep
+
+    @property
+    def rotary(self):
+        return self._rotary
+
+    @property
+    def display(self):
+        return self._display
+
+    @property
+    def key(self):
+        return self._key
+
+    @property
+    def screen(self):
+        return self._screen
+
+    def tick(self) -> None:
+        self.tick_timers()
+        self.tick_rotary()
+        self.render()
+
+    def _frame(self) -> None:
+        self.render()
+        self.flush()
+
+    def _render(self) -> None:
+        animation.tick()
+        if len(self._timers) == 1:
+            timer = self.timer
+            timer.format_into(self._text)
+            self._screen.set_text(self._text)
+            self._screen.set_progress(timer.remaining_ms(), timer.duration_ms)
+        else:
+            first = self._first_visible()
+            last = min(len(self._timers), first + COMPACT_ROWS)
+            for i in range(first, last):
+                self._timers[i].format_into(self._row_text[i - first])
+            self._screen.set_rows(self._row_text, last - first, self._timers.selected - first)
+        self._screen.show()
+
+    def ms_to_next_change(self):
+        ms = self._timers.next_expiry_ms()
+        if ms is None:
+            return None
+        first = self._first_visible()
+        for i in range(first, min(len(self._timers), first + COMPACT_ROWS)):
+            timer = self._timers[i]
+            if timer.running:
+                ms = min(ms, timer.ms_to_next_change())
+        return ms
+
+    def _first_visible(self):
+        # Returns only the first index so the render path builds no tuple;
+        # the window ends COMPACT_ROWS later or at the last timer.
+        return self._timers.selected // COMPACT_ROWS * COMPACT_ROWS
+
+class Rotary(RotaryIRQ):
+    def __init__(self, on_changed=None, on_pressed=None, acceleration=ROTARY_ACCELERATION):
+        super().__init__(
+            pin_num_clk=18,
+            pin_num_dt=19,
+            min_val=0,
+            max_val = 300,
+            reverse=True,
+            pull_up=True,
+            invert=False,
+            range_mode=RotaryIRQ.RANGE_UNBOUNDED)
+        
+        self.acceleration = acceleration
+        self.on_changed = on_changed
+        # Accelerated detents are only ever added to in dispatch and read in
+        # tick(), so neither side has to reset a counter the other may touch.
+        self._steps_total = 0
+        self._steps_seen = 0
+        self._last_delta = 0
+        self._last_step_us = 0
+        self._last_step_ms = time.ticks_ms()
+
+    def tick(self):
+        steps = self._steps_total - self._steps_seen
+        if steps:
+            self._steps_seen += steps
+            self._on_changed(steps)
+
+    def _on_step(self, delta, ticks_us):
+        # ticks_us wraps every 2**30 us, so after about nine idle minutes
+        # the gap between edge stamps reads as anything. Idle time is
+        # measured in ticks_ms instead, and a detent after more idle than
+        # the slowest accelerated gap starts afresh.
+        now_ms = time.ticks_ms()
+        if self.acceleration and time.ticks_diff(now_ms, self._last_step_ms) > self.acceleration[-1][0]:
+            self._last_delta = 0
+        weight = 1
+        if self._last_delta and (delta > 0) == (self._last_delta > 0):
+            gap_ms = time.ticks_diff(ticks_us, self._last_step_us) // 1000
+            if gap_ms >= 0:
+                for max_gap_ms, detents in self.acceleration:
+                    if gap_ms <= max_gap_ms:
+                        weight = detents
+                        break
+        self._last_delta = delta
+        self._last_step_us = ticks_us
+        self._last_step_ms = now_ms
+        self._steps_total += delta * weight
+
+    def _on_changed(self, steps):
+        if self.on_changed:
+            self.on_changed(self, steps)
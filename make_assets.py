@@ -0,0 +1,41 @@
+"""Regenerate glyph_data.py, the segment glyphs pre-rendered for flash.
+
+    python make_assets.py
+
+Run on the host after changing SegmentedText's segments or the sizes the
+screen uses, and check the result in alongside the change.
+"""
+import sim
+
+sim.install()
+
+from kitchen import OLED, SegmentedText
+
+OUTPUT = 'glyph_data.py'
+# (seg_size, seg_space) pairs drawn by ScreenPresenter.
+SIZES = ((15, 6), (5, 3))
+
+
+def generate():
+    text = SegmentedText(OLED())
+    lines = [
+        '# Generated by make_assets.py; do not edit.',
+        '# (seg_size, seg_space) -> ((code, width, height, advance, MONO_HMSB bitmap), ...)',
+        'GLYPHS = {',
+    ]
+    for seg_size, seg_space in SIZES:
+        text.seg_size = seg_size
+        text.seg_space = seg_space
+        lines.append('    ({}, {}): ('.format(seg_size, seg_space))
+        for s in text.glyph_chars():
+            data, width, height, advance = text.render_glyph(s)
+            lines.append('        ({}, {}, {}, {}, {!r}),'.format(ord(s), width, height, advance, bytes(data)))
+        lines.append('    ),')
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+if __name__ == '__main__':
+    with open(OUTPUT, 'w') as f:
+        f.write(generate())
+    print('wrote', OUTPUT)
@@ -0,0 +1,29 @@
+# Freeze the firmware modules into a MicroPython image for the Pico:
+#
+#   make -C ports/rp2 BOARD=RPI_PICO FROZEN_MANIFEST=/path/to/kitchen-timer/manifest.py
+#
+# Frozen bytecode runs from flash, so nothing is compiled at boot and the
+# const bytes assets stay out of RAM. main.py stays on the filesystem.
+#
+# This is the port's boards/manifest.py with its _boot.py swapped for ours,
+# which leaves the top of flash storage to the timer journal.
+freeze("$(PORT_DIR)/modules", "rp2.py")
+include("$(MPY_DIR)/extmod/asyncio")
+require("onewire")
+require("ds18x20")
+require("dht")
+require("neopixel")
+
+module("_boot.py")
+
+module("rotary_irq.py")
+module("assets.py")
+module("glyph_data.py")
+module("profiler.py")
+module("kitchen.py")
+module("panel_dma.py")
+module("power.py")
+module("journal.py")
+module("runtime.py")
+module("protocol.py")
+module("console.py")
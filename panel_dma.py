@@ -0,0 +1,95 @@
+"""DMA flush backend for the panel on the RP2040's SPI1.
+
+    display.start_dma(DMAFlush(display))
+
+The panel is set up for vertical addressing (see kitchen._INIT_SEQUENCE):
+after a column's 16 bytes it carries on with the next column, so any run
+of adjacent columns is one address command and one stream of data. The
+CPU sends the command, a DMA channel paced by the SPI TX FIFO sends the
+data, and show() returns as soon as the channel is started. Needs rp2.DMA,
+MicroPython 1.22 or later; without it the import fails and the blocking
+SPI path stays in use.
+"""
+import machine
+import time
+from rp2 import DMA
+
+import uasyncio as asyncio
+
+_SPI1_SSPDR = const(0x40040008)
+_SPI1_SSPSR = const(0x4004000c)
+_SSPSR_BSY = const(0x10)
+_DREQ_SPI1_TX = const(18)
+_POLL_US = const(20)
+
+
+class DMAFlush:
+    """Sends buffer to the panel in the background, one run of columns at a time.
+
+    OLED fills buffer in panel column order and calls start(). done is set
+    from the channel's IRQ once the last byte has left the bus; wait()
+    blocks until then, as anything else that uses the bus must.
+    """
+
+    def __init__(self, display):
+        self._display = display
+        self._dma = DMA()
+        self._ctrl = self._dma.pack_ctrl(size=0, inc_read=True, inc_write=False,
+                                         treq_sel=_DREQ_SPI1_TX, irq_quiet=False)
+        self._dma.irq(self._on_irq)
+        self._active = False
+        self.buffer = bytearray(len(display.buffer))
+        self.done = asyncio.ThreadSafeFlag()
+        self.transfers = 0
+        self.bytes_sent = 0
+        # Time spent in wait() for a transfer to end: the part of the bus
+        # time that did not overlap with other work.
+        self.wait_us = 0
+
+    @property
+    def busy(self):
+        return self._active
+
+    def start(self, command, count):
+        """Send command, then start count bytes of buffer as data and return."""
+        display = self._display
+        display.cs(1)
+        display.dc(0)
+        display.cs(0)
+        # A blocking write: it returns once the command is off the bus, so
+        # DC can change right after it.
+        display.spi.write(command)
+        display.dc(1)
+        self._active = True
+        self.transfers += 1
+        self.bytes_sent += len(command) + count
+        self._dma.config(read=self.buffer, write=_SPI1_SSPDR, count=count, ctrl=self._ctrl, trigger=True)
+
+    def wait(self):
+        if not self._active:
+            return
+        start = time.ticks_us()
+        while self._active:
+            if self._dma.active():
+                time.sleep_us(_POLL_US)
+            else:
+                self._finish()
+        self.wait_us += time.ticks_diff(time.ticks_us(), start)
+
+    def close(self):
+        self.wait()
+        self._dma.close()
+
+    def _on_irq(self, dma):
+        # Scheduled, so wait() may have finished this transfer already.
+        if self._active and not dma.active():
+            self._finish()
+
+    def _finish(self):
+        # The channel is done once the last bytes are in the FIFO; CS has to
+        # stay low until they are shifted out.
+        while machine.mem32[_SPI1_SSPSR] & _SSPSR_BSY:
+            pass
+        self._display.cs(1)
+        self._active = False
+        self.done.set()
@@ -0,0 +1,88 @@
+import machine
+import time
+from array import array
+
+POWER_ACTIVE = 0
+POWER_DIMMED = 1
+POWER_ASLEEP = 2
+POWER_STATES = ('active', 'dimmed', 'asleep')
+
+
+class IdleGovernor:
+    """Dims the panel and puts the chip in lightsleep while nothing is happening.
+
+    The unit counts as idle when no timer is running, no alarm is sounding
+    and there was no input for idle_after_ms. It then dims the panel, stops
+    rendering and sleeps until a pin IRQ from the key or the knob, or until
+    the next timer deadline if there is one. activity() brings it back.
+    Time spent in each power state is kept in time_ms.
+
+    lightsleep stops the USB clock, so the serial link is dead while the
+    chip sleeps: the host sees no telemetry or replies, and what it sends
+    is lost. Given the protocol, the unit stays awake while the host is
+    subscribed to telemetry.
+    """
+
+    DIM_CONTRAST = 0x04
+
+    def __init__(self, state, display, idle_after_ms=30_000, sleep=machine.lightsleep, protocol=None):
+        self._state = state
+        self._display = display
+        self._protocol = protocol
+        self._sleep = sleep
+        self.idle_after_ms = idle_after_ms
+        self.power_state = POWER_ACTIVE
+        self.time_ms = array('L', (0 for _ in POWER_STATES))
+        self.wakeups = 0
+        self._entered = time.ticks_ms()
+        self._last_activity = self._entered
+
+    def activity(self):
+        self._last_activity = time.ticks_ms()
+        if self.power_state != POWER_ACTIVE:
+            self._enter(POWER_ACTIVE)
+            self._display.contrast(self._display.CONTRAST)
+
+    def ms_to_idle(self):
+        """Milliseconds until the unit may sleep, or None while a timer, an alarm or telemetry keeps it awake."""
+        timers = self._state.timers
+        if timers.in_alarm or timers.next_expiry_ms() is not None:
+            return None
+        if self._protocol is not None and self._protocol.interval_ms:
+            return None
+        return max(0, self.idle_after_ms - time.ticks_diff(time.ticks_ms(), self._last_activity))
+
+    def sleep(self):
+        """Sleep once; returns after a pin IRQ or the next deadline."""
+        if self.power_state == POWER_ACTIVE:
+            self._enter(POWER_DIMMED)
+            self._display.contrast(self.DIM_CONTRAST)
+        ms = self._state.ms_to_next_change()
+        self._enter(POWER_ASLEEP)
+        # Never in the middle of a flush from the worker.
+        with self._display.hold_bus():
+            if ms is None:
+                self._sleep()
+            else:
+                self._sleep(ms)
+        self.wakeups += 1
+        self._enter(POWER_DIMMED)
+
+    def _enter(self, power_state):
+        now = time.ticks_ms()
+        self.time_ms[self.power_state] += time.ticks_diff(now, self._entered)
+        self._entered = now
+        self.power_state = power_state
+
+    def report(self):
+        self._enter(self.power_state)
+        total = sum(self.time_ms) or 1
+        for i in range(len(POWER_STATES)):
+            print('{:<8} {:>10} ms {:>5.1f}%'.format(POWER_STATES[i], self.time_ms[i], 100 * self.time_ms[i] / total))
+        print('wakeups', self.wakeups)
+
+    def reset(self):
+        self._enter(self.power_state)
+        for i in range(len(POWER_STATES)):
+            self.time_ms[i] = 0
+        self.wakeups = 0
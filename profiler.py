@@ -0,0 +1,83 @@
+import gc
+import time
+from array import array
+
+STAGE_TIMER = 0
+STAGE_ROTARY = 1
+STAGE_SCREEN = 2
+STAGE_DISPLAY = 3
+STAGE_FRAME = 4
+STAGES = ('timer', 'rotary', 'screen', 'display', 'frame')
+
+# Upper edges of the latency buckets in us; one more bucket takes the rest.
+BUCKETS_US = (100, 250, 500, 1000, 2500, 5000, 10000, 25000)
+
+
+class Profiler:
+    """Fixed-size latency histograms and allocation counters per stage.
+
+    All storage is preallocated, so recording a sample allocates nothing.
+    The profiler only costs anything while its wrappers are installed, see
+    State.instrument().
+    """
+
+    def __init__(self, frame_budget_us=20000):
+        self.frame_budget_us = frame_budget_us
+        self._buckets = len(BUCKETS_US) + 1
+        self._histogram = array('L', [0] * (len(STAGES) * self._buckets))
+        self._max_us = array('L', [0] * len(STAGES))
+        self._alloc_bytes = array('L', [0] * len(STAGES))
+        self.missed_frames = 0
+        self.rotary = None
+
+    def reset(self):
+        for i in range(len(self._histogram)):
+            self._histogram[i] = 0
+        for i in range(len(STAGES)):
+            self._max_us[i] = 0
+            self._alloc_bytes[i] = 0
+        self.missed_frames = 0
+
+    def wrap(self, stage, fn):
+        def timed():
+            alloc = gc.mem_alloc()
+            start = time.ticks_us()
+            fn()
+            self.record(stage, time.ticks_diff(time.ticks_us(), start), gc.mem_alloc() - alloc)
+        return timed
+
+    def record(self, stage, us, alloc_bytes):
+        bucket = 0
+        while bucket < len(BUCKETS_US) and us > BUCKETS_US[bucket]:
+            bucket += 1
+        self._histogram[stage * self._buckets + bucket] += 1
+        if us > self._max_us[stage]:
+            self._max_us[stage] = us
+        # A collection during the stage makes the difference negative.
+        if alloc_bytes > 0:
+            self._alloc_bytes[stage] += alloc_bytes
+        if stage == STAGE_FRAME and us > self.frame_budget_us:
+            self.missed_frames += 1
+
+    def count(self, stage):
+        # By index: a slice would be a new array on every telemetry packet.
+        histogram = self._histogram
+        start = stage * self._buckets
+        n = 0
+        for i in range(start, start + self._buckets):
+            n += histogram[i]
+        return n
+
+    def max_us(self, stage):
+        return self._max_us[stage]
+
+    def report(self):
+        print('stage    n     max_us  alloc_B  <=' + ' '.join(str(edge) for edge in BUCKETS_US) + ' more')
+        for stage in range(len(STAGES)):
+            start = stage * self._buckets
+            print('{:8} {:5} {:7} {:8}  {}'.format(
+                STAGES[stage], self.count(stage), self._max_us[stage], self._alloc_bytes[stage],
+                ' '.join(str(n) for n in self._histogram[start:start + self._buckets])))
+        print('missed frames (>{} us): {}'.format(self.frame_budget_us, self.missed_frames))
+        if self.rotary is not None:
+            print('rotary overflows:', self.rotary.overflows)
@@ -0,0 +1,322 @@
+"""Binary control and telemetry protocol over the USB serial port.
+
+A packet is the sync byte 0xA5, a length byte, a type byte, the payload
+and a CRC-8 (polynomial 0x07) over length, type and payload; the length
+counts the type byte and the payload. Integers are little-endian.
+
+Host to device:
+    QUERY      -                       reply STATUS
+    SET        index u8, seconds u32   reply ACK; capped at MAX_ALARM_IN
+    START      index u8                reply ACK
+    PAUSE      index u8                reply ACK
+    TELEMETRY  interval_ms u16         reply ACK; 0 stops telemetry
+    MELODY     melody u8               reply ACK; index into MELODY_NAMES
+
+Device to host:
+    ACK        command u8, status u8
+    STATUS     count u8, then per timer: flags u8, remaining_ms u32, duration_s u16
+    TELEMETRY  uptime_ms u32, frames u32, frame_max_us u32, encoder i32,
+               overflows u16, then the STATUS timers block
+
+Everything the device sends goes through an OutputQueue that only writes
+while the stream can take it, so a host that stops reading costs queued
+packets, never a stalled loop.
+"""
+import struct
+import sys
+import time
+from array import array
+
+import uasyncio as asyncio
+
+from kitchen import MAX_ALARM_IN, MELODY_NAMES
+
+SYNC = 0xa5
+MAX_PAYLOAD = 56
+
+QUERY = 0x01
+SET = 0x02
+START = 0x03
+PAUSE = 0x04
+TELEMETRY = 0x05
+MELODY = 0x06
+ACK = 0x81
+STATUS = 0x82
+TELEMETRY_DATA = 0x83
+
+ACK_OK = 0
+ACK_BAD_TIMER = 1
+ACK_BAD_COMMAND = 2
+
+FLAG_RUNNING = 1
+FLAG_ALARM = 2
+
+_TIMER_FORMAT = '<BIH'
+_TIMER_SIZE = struct.calcsize(_TIMER_FORMAT)
+_TELEMETRY_FORMAT = '<IIIiH'
+_TELEMETRY_SIZE = struct.calcsize(_TELEMETRY_FORMAT)
+# Frame and queue slot size: sync, length, type, payload, CRC.
+PACKET_SIZE = MAX_PAYLOAD + 4
+
+
+def crc8(data, crc=0):
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xff if crc & 0x80 else (crc << 1) & 0xff
+    return crc
+
+
+def encode_into(buf, kind, payload_len):
+    """Frame the payload already at buf[3:3 + payload_len]; returns the packet length."""
+    buf[0] = SYNC
+    buf[1] = payload_len + 1
+    buf[2] = kind
+    buf[3 + payload_len] = crc8(memoryview(buf)[1:3 + payload_len])
+    return payload_len + 4
+
+
+def encode(kind, payload=b''):
+    buf = bytearray(len(payload) + 4)
+    buf[3:3 + len(payload)] = payload
+    encode_into(buf, kind, len(payload))
+    return bytes(buf)
+
+
+class Decoder:
+    """Splits a byte stream into (kind, payload) packets, skipping anything else."""
+
+    def __init__(self):
+        self._buf = bytearray()
+        self.errors = 0
+
+    def feed(self, data):
+        self._buf += data
+        packets = []
+        buf = self._buf
+        while True:
+            start = buf.find(bytes((SYNC,)))
+            if start < 0:
+                buf[:] = b''
+                break
+            del buf[:start]
+            if len(buf) < 2:
+                break
+            length = buf[1]
+            if length == 0 or length > MAX_PAYLOAD + 1:
+                self.errors += 1
+                del buf[:1]
+                continue
+            if len(buf) < length + 3:
+                break
+            if crc8(buf[1:length + 2]) != buf[length + 2]:
+                self.errors += 1
+                del buf[:1]
+                continue
+            packets.append((buf[2], bytes(buf[3:length + 2])))
+            del buf[:length + 3]
+        return packets
+
+
+def _poll_writable(stream):
+    import select
+    poller = select.poll()
+    poller.register(stream, select.POLLOUT)
+    return lambda: bool(poller.poll(0))
+
+
+class OutputQueue:
+    """A few preallocated packet slots, written out only while the stream is writable.
+
+    When full the oldest packet is dropped; a coalescing put() replaces a
+    pending packet of the same type instead, so stale telemetry never
+    queues up behind a host that is not reading.
+    """
+
+    def __init__(self, stream, writable=None, slots=4):
+        self._stream = stream
+        self._writable = writable or _poll_writable(stream)
+        self._slots = [bytearray(PACKET_SIZE) for _ in range(slots)]
+        self._lengths = array('H', [0] * slots)
+        self._head = 0
+        self._count = 0
+        # Bytes of the head packet already written.
+        self._sent = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self._count
+
+    def put(self, packet, length, coalesce=False):
+        slots = len(self._slots)
+        if coalesce:
+            # The head may be partly written already; only later slots are replaced.
+            for i in range(1 if self._sent else 0, self._count):
+                slot = (self._head + i) % slots
+                if self._slots[slot][2] == packet[2]:
+                    self._slots[slot][:length] = packet[:length]
+                    self._lengths[slot] = length
+                    self.dropped += 1
+                    return
+        if self._count == slots:
+            self._head = (self._head + 1) % slots
+            self._count -= 1
+            self._sent = 0
+            self.dropped += 1
+        slot = (self._head + self._count) % slots
+        self._slots[slot][:length] = packet[:length]
+        self._lengths[slot] = length
+        self._count += 1
+
+    def pump(self):
+        """Write as much as the stream takes without blocking; returns the packets left."""
+        while self._count and self._writable():
+            head = self._head
+            view = memoryview(self._slots[head])[self._sent:self._lengths[head]]
+            written = self._stream.write(view)
+            self._sent += len(view) if written is None else written
+            if self._sent < self._lengths[head]:
+                break
+            self._head = (head + 1) % len(self._slots)
+            self._count -= 1
+            self._sent = 0
+        return self._count
+
+
+class Protocol:
+    PUMP_MS = 10
+
+    def __init__(self, state, profiler=None, stream=None, writable=None):
+        if stream is None:
+            stream = getattr(sys.stdout, 'buffer', sys.stdout)
+        self._state = state
+        self._profiler = profiler
+        self._out = OutputQueue(stream, writable)
+        self._tx = bytearray(PACKET_SIZE)
+        self._pending = asyncio.ThreadSafeFlag()
+        self._telemetry_changed = asyncio.ThreadSafeFlag()
+        self.interval_ms = 0
+        self.rx_errors = 0
+        # Called after a command has changed a timer or the telemetry.
+        self.on_command = None
+
+    @property
+    def output(self):
+        return self._out
+
+    async def receive(self, reader):
+        """Read one packet after its sync byte and handle it."""
+        length = (await reader.readexactly(1))[0]
+        if length == 0 or length > MAX_PAYLOAD + 1:
+            self.rx_errors += 1
+            return
+        body = await reader.readexactly(length + 1)
+        if crc8(bytes((length,)) + body[:length]) != body[length]:
+            self.rx_errors += 1
+            return
+        self.handle(body[0], memoryview(body)[1:length])
+
+    def handle(self, kind, payload):
+        if kind == QUERY and len(payload) == 0:
+            self._send_status()
+            return
+        status = ACK_BAD_COMMAND
+        if kind == TELEMETRY and len(payload) == 2:
+            self.interval_ms = struct.unpack('<H', payload)[0]
+            self._telemetry_changed.set()
+            if self.on_command is not None:
+                self.on_command()
+            status = ACK_OK
+        elif kind == MELODY and len(payload) == 1 and payload[0] < len(MELODY_NAMES):
+            self._state.beep.select(MELODY_NAMES[payload[0]])
+            status = ACK_OK
+        elif kind in (SET, START, PAUSE) and len(payload) == (5 if kind == SET else 1):
+            status = self._command(kind, payload)
+        self._send_ack(kind, status)
+
+    def _command(self, kind, payload):
+        timers = self._state.timers
+        index = payload[0]
+        if index >= len(timers):
+            return ACK_BAD_TIMER
+        timer = timers[index]
+        if kind == SET:
+            timer.alarm_in = min(MAX_ALARM_IN, struct.unpack('<I', payload[1:5])[0])
+            timer.in_alarm = False
+        elif kind == START and not timer.running:
+            timer.start()
+        elif kind == PAUSE and timer.running:
+            timer.pause()
+        if index == timers.selected:
+            self._state.screen.set_paused(not timer.running)
+        if self.on_command is not None:
+            self.on_command()
+        return ACK_OK
+
+    async def run(self):
+        await asyncio.gather(self._telemetry_task(), self._pump_task())
+
+    async def _telemetry_task(self):
+        while True:
+            if not self.interval_ms:
+                await self._telemetry_changed.wait()
+                continue
+            # One packet per interval with the state at its end.
+            await asyncio.sleep_ms(self.interval_ms)
+            if self.interval_ms:
+                self._send_telemetry()
+
+    async def _pump_task(self):
+        while True:
+            await self._pending.wait()
+            while self._out.pump():
+                await asyncio.sleep_ms(self.PUMP_MS)
+
+    def _send_ack(self, command, status):
+        self._tx[3] = command
+        self._tx[4] = status
+        self._send(ACK, 2)
+
+    def _send_status(self):
+        self._send(STATUS, self._pack_timers(3))
+
+    def _send_telemetry(self):
+        frames = frame_max_us = 0
+        profiler = self._profiler
+        if profiler is not None:
+            from profiler import STAGE_FRAME
+            frames = profiler.count(STAGE_FRAME)
+            frame_max_us = profiler.max_us(STAGE_FRAME)
+        rotary = self._state.rotary
+        struct.pack_into(_TELEMETRY_FORMAT, self._tx, 3, time.ticks_ms(), frames, frame_max_us,
+                         rotary.value(), rotary.overflows & 0xffff)
+        length = self._pack_timers(3 + _TELEMETRY_SIZE)
+        self._send(TELEMETRY_DATA, _TELEMETRY_SIZE + length, coalesce=True)
+
+    def _pack_timers(self, offset):
+        timers = self._state.timers
+        count = min(len(timers), (MAX_PAYLOAD - (offset - 3) - 1) // _TIMER_SIZE)
+        self._tx[offset] = count
+        for i in range(count):
+            timer = timers[i]
+            flags = (FLAG_RUNNING if timer.running else 0) | (FLAG_ALARM if timer.in_alarm else 0)
+            struct.pack_into(_TIMER_FORMAT, self._tx, offset + 1 + i * _TIMER_SIZE,
+                             flags, timer.remaining_ms(), timer.duration_ms // 1000)
+        return 1 + count * _TIMER_SIZE
+
+    def _send(self, kind, payload_len, coalesce=False):
+        length = encode_into(self._tx, kind, payload_len)
+        self._out.put(self._tx, length, coalesce)
+        self._pending.set()
+
+
+def parse_timers(payload):
+    """Decode a STATUS timers block into (flags, remaining_ms, duration_s) tuples."""
+    count = payload[0]
+    return [struct.unpack_from(_TIMER_FORMAT, payload, 1 + i * _TIMER_SIZE) for i in range(count)]
+
+
+def parse_telemetry(payload):
+    """Decode TELEMETRY_DATA into (uptime_ms, frames, frame_max_us, encoder, overflows, timers)."""
+    fields = struct.unpack_from(_TELEMETRY_FORMAT, payload, 0)
+    return fields + (parse_timers(payload[_TELEMETRY_SIZE:]),)
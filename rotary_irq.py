@@ -1,5 +1,6 @@
 import micropython
 import time
+from array import array
 from machine import Pin
 
 _DIR_CW = const(0x10)  # Clockwise step
@@ -39,9 +40,18 @@ _transition_table_half_step = [
     [_R_START,           _R_START, _R_START, _R_START],
     [_R_START,           _R_START, _R_START, _R_START]]
 
+# The same tables flattened into bytes and indexed state * 4 + pins, for
+# the IRQ handler.
+_transitions = bytes(state for row in _transition_table for state in row)
+_transitions_half_step = bytes(state for row in _transition_table_half_step for state in row)
+
 _STATE_MASK = const(0x07)
 _DIR_MASK = const(0x30)
 
+# Steps queued by the pin IRQ until the scheduled dispatch drains them.
+# One slot is kept free to tell a full ring from an empty one.
+_EVENT_SLOTS = const(16)
+
 
 def _wrap(value, incr, lower_bound, upper_bound):
     range = upper_bound - lower_bound + 1
@@ -60,6 +70,10 @@ def _bound(value, incr, lower_bound, upper_bound):
     return min(upper_bound, max(lower_bound, value + incr))
 
 
+def _unbounded(value, incr, lower_bound, upper_bound):
+    return value + incr
+
+
 def _trigger(rotary_instance):
     for listener in rotary_instance._listener:
         listener()
@@ -71,7 +85,7 @@ class Rotary(object):
     RANGE_WRAP = const(2)
     RANGE_BOUNDED = const(3)
 
-    def __init__(self, min_val, max_val, incr, reverse, range_mode, half_step, invert):
+    def __init__(self, min_val, max_val, incr, reverse, range_mode, half_step, invert, fast=True):
         self._min_val = min_val
         self._max_val = max_val
         self._incr = incr
@@ -82,6 +96,18 @@ class Rotary(object):
         self._half_step = half_step
         self._invert = invert
         self._listener = []
+        self._event_delta = array('i', [0] * _EVENT_SLOTS)
+        self._event_us = array('L', [0] * _EVENT_SLOTS)
+        self._event_head = 0
+        self._event_tail = 0
+        self._dispatch_pending = False
+        # Bound once here: creating the bound method inside the IRQ would allocate.
+        self._dispatch_ref = self._dispatch
+        # The pin IRQ handler: native code, or bytecode where there is no
+        # native emitter.
+        self._handler = self._process_rotary_pins_native if fast else self._process_rotary_pins
+        self.overflows = 0
+        self._configure()
 
     def set(self, value=None, min_val=None, incr=None,
             max_val=None, reverse=None, range_mode=None):
@@ -100,15 +126,30 @@ class Rotary(object):
             self._reverse = -1 if reverse else 1
         if range_mode is not None:
             self._range_mode = range_mode
+        self._configure()
         self._state = _R_START
+        self._event_tail = self._event_head
 
         # enable DT and CLK pin interrupts
         self._hal_enable_irq()
 
+    def _configure(self):
+        # Pick everything that depends on the settings once, so neither the
+        # IRQ nor dispatch branch on them per edge.
+        self._table = _transitions_half_step if self._half_step else _transitions
+        self._pins_xor = 0x03 if self._invert else 0x00
+        if self._range_mode == self.RANGE_WRAP:
+            self._range = _wrap
+        elif self._range_mode == self.RANGE_BOUNDED:
+            self._range = _bound
+        else:
+            self._range = _unbounded
+
     def value(self):
         return self._value
 
     def reset(self):
+        self._event_tail = self._event_head
         self._value = 0
 
     def close(self):
@@ -123,50 +164,71 @@ class Rotary(object):
         self._listener.remove(l)
         
     def _process_rotary_pins(self, pin):
-        old_value = self._value
-        clk_dt_pins = (self._hal_get_clk_value() <<
-                       1) | self._hal_get_dt_value()
-                       
-        if self._invert:
-            clk_dt_pins = ~clk_dt_pins & 0x03
-            
+        # Runs in hard IRQ context: no allocation and no listener calls, only
+        # the state transition and a push onto the event ring.
+        clk_dt_pins = ((self._hal_get_clk_value() <<
+                        1) | self._hal_get_dt_value()) ^ self._pins_xor
+
         # Determine next state
-        if self._half_step:
-            self._state = _transition_table_half_step[self._state &
-                                                      _STATE_MASK][clk_dt_pins]
-        else:
-            self._state = _transition_table[self._state &
-                                            _STATE_MASK][clk_dt_pins]
+        self._state = self._table[((self._state & _STATE_MASK) << 2) | clk_dt_pins]
         direction = self._state & _DIR_MASK
 
-        incr = 0
         if direction == _DIR_CW:
             incr = self._incr
         elif direction == _DIR_CCW:
             incr = -self._incr
-
-        incr *= self._reverse
-
-        if self._range_mode == self.RANGE_WRAP:
-            self._value = _wrap(
-                self._value,
-                incr,
-                self._min_val,
-                self._max_val)
-        elif self._range_mode == self.RANGE_BOUNDED:
-            self._value = _bound(
-                self._value,
-                incr,
-                self._min_val,
-                self._max_val)
         else:
-            self._value = self._value + incr
-
-        try:
-            if old_value != self._value and len(self._listener) != 0:
-                _trigger(self)
-        except:
-            pass
+            return
+
+        head = self._event_head
+        next_head = (head + 1) % _EVENT_SLOTS
+        if next_head == self._event_tail:
+            self.overflows += 1
+            return
+        self._event_delta[head] = incr * self._reverse
+        self._event_us[head] = time.ticks_us()
+        self._event_head = next_head
+
+        if not self._dispatch_pending:
+            self._dispatch_pending = True
+            try:
+                micropython.schedule(self._dispatch_ref, 0)
+            except RuntimeError:
+                # Schedule queue full; the next edge tries again. With the
+                # heap locked the error is the preallocated emergency one.
+                self._dispatch_pending = False
+
+    # The same handler compiled to machine code; builds without the native
+    # emitter have no micropython.native and run the bytecode one.
+    try:
+        _process_rotary_pins_native = micropython.native(_process_rotary_pins)
+    except AttributeError:
+        _process_rotary_pins_native = _process_rotary_pins
+
+    def _dispatch(self, _):
+        self._dispatch_pending = False
+        old_value = self._value
+        tail = self._event_tail
+        while tail != self._event_head:
+            delta = self._event_delta[tail]
+            ticks_us = self._event_us[tail]
+            tail = (tail + 1) % _EVENT_SLOTS
+            self._event_tail = tail
+            self._apply(delta)
+            self._on_step(delta, ticks_us)
+
+        if old_value != self._value and len(self._listener) != 0:
+            _trigger(self)
+
+    def _apply(self, incr):
+        self._value = self._range(
+            self._value,
+            incr,
+            self._min_val,
+            self._max_val)
+
+    def _on_step(self, delta, ticks_us):
+        pass
 
 class RotaryIRQ(Rotary):
     def __init__(
@@ -180,9 +242,10 @@ class RotaryIRQ(Rotary):
         range_mode=Rotary.RANGE_UNBOUNDED,
         pull_up=False,
         half_step=False,
-        invert=False
+        invert=False,
+        fast=True
     ):
-        super().__init__(min_val, max_val, incr, reverse, range_mode, half_step, invert)
+        super().__init__(min_val, max_val, incr, reverse, range_mode, half_step, invert, fast)
 
         if pull_up:
             self._pin_clk = Pin(pin_num_clk, Pin.IN, Pin.PULL_UP)
@@ -190,14 +253,18 @@ class RotaryIRQ(Rotary):
         else:
             self._pin_clk = Pin(pin_num_clk, Pin.IN)
             self._pin_dt = Pin(pin_num_dt, Pin.IN)
+        # The handler reads the pins through these; binding Pin.value here
+        # saves a Python call per pin per edge.
+        self._hal_get_clk_value = self._pin_clk.value
+        self._hal_get_dt_value = self._pin_dt.value
 
         self._hal_enable_irq()
 
     def _enable_clk_irq(self):
-        self._pin_clk.irq(self._process_rotary_pins, IRQ_RISING_FALLING)
+        self._pin_clk.irq(self._handler, IRQ_RISING_FALLING, hard=True)
 
     def _enable_dt_irq(self):
-        self._pin_dt.irq(self._process_rotary_pins, IRQ_RISING_FALLING)
+        self._pin_dt.irq(self._handler, IRQ_RISING_FALLING, hard=True)
 
     def _disable_clk_irq(self):
         self._pin_clk.irq(None, 0)
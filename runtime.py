@@ -0,0 +1,179 @@
+import machine
+import uasyncio as asyncio
+
+from power import POWER_ACTIVE
+
+# How long to wait after a wake-up for the input that caused it before
+# going back to sleep.
+WAKE_GRACE_MS = 50
+# Changes within this long of one another go to the journal as one record.
+JOURNAL_SETTLE_MS = 2000
+
+
+class Runtime:
+    """Event-driven replacement for the fixed-period polling loop.
+
+    Each concern runs as its own task and sleeps until it is signalled or
+    until the next moment its output can change: the timer on whole-second
+    boundaries, the pause icon on its blink edges. Pin
+    IRQs only set flags, so input is handled and drawn as soon as the
+    scheduler gets to it. With an IdleGovernor the whole loop is put into
+    lightsleep when there is nothing left to count down or show. With a
+    Journal, timer state is written to flash after it changes. With a
+    Protocol, its commands are handled like input and its telemetry and
+    output tasks run alongside.
+    """
+
+    def __init__(self, state, display, console=None, governor=None, journal=None, protocol=None):
+        self._state = state
+        self._display = display
+        self._console = console
+        self._governor = governor
+        self._journal = journal
+        self._protocol = protocol
+        self._activity = asyncio.ThreadSafeFlag()
+        self._state_changed = asyncio.ThreadSafeFlag()
+        self._redraw = asyncio.ThreadSafeFlag()
+        self._timer_changed = asyncio.ThreadSafeFlag()
+        self._rotary_moved = asyncio.ThreadSafeFlag()
+        self._key_pressed = asyncio.ThreadSafeFlag()
+        self._command_received = asyncio.ThreadSafeFlag()
+        self._activity_timeout = _Timeout(self._activity)
+        self._state_changed_timeout = _Timeout(self._state_changed)
+        self._redraw_timeout = _Timeout(self._redraw)
+        self._timer_changed_timeout = _Timeout(self._timer_changed)
+
+        state.rotary.add_listener(self._rotary_moved.set)
+        state.key.on_event = self._key_pressed.set
+        if protocol is not None:
+            protocol.on_command = self._command_received.set
+
+    async def run(self):
+        self._redraw.set()
+        tasks = [
+            self._timer_task(),
+            self._display_task(),
+            self._rotary_task(),
+            self._key_task()]
+        if self._governor is not None:
+            tasks.append(self._idle_task())
+        if self._journal is not None:
+            tasks.append(self._journal_task())
+        if self._protocol is not None:
+            tasks.append(self._command_task())
+            tasks.append(self._protocol.run())
+        if self._console is not None:
+            tasks.append(self._console.run())
+        await asyncio.gather(*tasks)
+
+    async def _timer_task(self):
+        timers = self._state.timers
+        while True:
+            expired = timers.expired
+            self._state.tick_timers()
+            if timers.expired != expired:
+                # A timer ran out and stopped. Input and start/pause are the
+                # only other changes the journal has to hear of.
+                self._state_changed.set()
+            self._redraw.set()
+            await self._timer_changed_timeout.wait(self._state.ms_to_next_change())
+
+    async def _display_task(self):
+        screen = self._state.screen
+        while True:
+            if self._is_dimmed():
+                # Nothing is drawn until input wakes the panel up again.
+                await self._redraw.wait()
+                if self._is_dimmed():
+                    continue
+            else:
+                await self._redraw_timeout.wait(screen.ms_to_next_change())
+            self._state.frame()
+
+    async def _rotary_task(self):
+        while True:
+            await self._rotary_moved.wait()
+            self._on_input()
+            self._state.tick_rotary()
+            self._state_changed.set()
+            self._timer_changed.set()
+            self._redraw.set()
+
+    async def _key_task(self):
+        while True:
+            await self._key_pressed.wait()
+            self._on_input()
+            self._state_changed.set()
+            self._timer_changed.set()
+            self._redraw.set()
+
+    async def _command_task(self):
+        while True:
+            await self._command_received.wait()
+            self._on_input()
+            self._state_changed.set()
+            self._timer_changed.set()
+            self._redraw.set()
+
+    async def _idle_task(self):
+        governor = self._governor
+        while True:
+            ms = governor.ms_to_idle()
+            if ms != 0:
+                await self._activity_timeout.wait(ms)
+                continue
+            governor.sleep()
+            # The IRQ that woke the chip only set a flag; give its task the
+            # chance to run before deciding to sleep again.
+            await self._activity_timeout.wait(WAKE_GRACE_MS)
+
+    async def _journal_task(self):
+        journal = self._journal
+        while True:
+            if await self._state_changed_timeout.wait(journal.interval_ms):
+                # Every further change starts the settle time again, so a
+                # burst of them, a turn of the knob, is written once it is over.
+                while await self._state_changed_timeout.wait(JOURNAL_SETTLE_MS):
+                    pass
+            journal.sync(self._state.timers)
+
+    def _on_input(self):
+        if self._governor is not None:
+            self._governor.activity()
+            self._activity.set()
+
+    def _is_dimmed(self):
+        return self._governor is not None and self._governor.power_state != POWER_ACTIVE
+
+
+class _Timeout:
+    """Waits on a flag for at most a given time.
+
+    asyncio.wait_for_ms would make a task and a timeout for every wait, and
+    the display and timer tasks wait once a frame. A one-shot timer that
+    sets the flag is re-armed instead. If it fires just as the flag is set
+    for real, the next wait returns at once and its task goes round again.
+    """
+
+    def __init__(self, flag):
+        self._flag = flag
+        self._timer = machine.Timer()
+        self._expired = False
+        # Bound once: the timer callback must not allocate.
+        self._on_timeout_ref = self._on_timeout
+
+    def _on_timeout(self, timer):
+        self._expired = True
+        self._flag.set()
+
+    async def wait(self, timeout_ms):
+        """Returns False if the time ran out before the flag was set."""
+        if timeout_ms is None:
+            await self._flag.wait()
+            return True
+        self._expired = False
+        self._timer.init(mode=machine.Timer.ONE_SHOT, period=max(1, timeout_ms),
+                         callback=self._on_timeout_ref)
+        await self._flag.wait()
+        self._timer.deinit()
+        return not self._expired
@@ -0,0 +1,86 @@
+"""Host-side stand-ins for running and measuring the firmware off-device.
+
+Call ``install()`` before importing any firmware module. It registers
+``machine``, ``framebuf``, ``micropython``, ``rp2`` and ``uasyncio`` stand-ins, the
+MicroPython-only builtins, ``time.ticks_*`` backed by a ``VirtualClock``,
+and ``gc.mem_alloc``/``gc.mem_free`` backed by ``tracemalloc``. While
+``gc.disable()`` is in effect, ``gc.mem_alloc()`` only grows, as on the
+device: a ``sim.alloc.Meter`` adds up what the firmware allocates.
+"""
+
+import builtins
+import gc
+import sys
+import tracemalloc
+
+from sim import clock as _clock
+from sim import pins as _pins
+
+
+def install(clock=None, bank=None):
+    """Install the stand-ins; returns ``(clock, pin_bank)``.
+
+    ``clock`` defaults to a running ``VirtualClock``; pass
+    ``VirtualClock(frozen=True)`` to control time explicitly.
+    """
+    from sim import framebuf, machine, micropython, rp2, uasyncio
+
+    for name, module in (('machine', machine), ('framebuf', framebuf),
+                         ('micropython', micropython), ('rp2', rp2), ('uasyncio', uasyncio)):
+        sys.modules.setdefault(name, module)
+
+    builtins.const = micropython.const
+    # Viper casts and annotations; on the host they are plain conversions.
+    for name in ('ptr', 'ptr8', 'ptr16', 'ptr32'):
+        setattr(builtins, name, _ptr)
+    builtins.uint = int
+
+    if not hasattr(gc, 'mem_alloc'):
+        gc.mem_alloc = _mem_alloc
+        gc.mem_free = _mem_free
+        gc.disable = _gc_disable
+        gc.enable = _gc_enable
+
+    clock = _clock.install(clock or _clock.VirtualClock())
+    bank = _pins.install(bank or _pins.PinBank())
+    return clock, bank
+
+
+def _ptr(obj):
+    return obj
+
+
+_meter = None
+_meter_base = 0
+_gc_disable_builtin = gc.disable
+_gc_enable_builtin = gc.enable
+
+
+def _gc_disable():
+    global _meter, _meter_base
+    _gc_disable_builtin()
+    if _meter is None:
+        from sim.alloc import Meter
+        _meter_base = _mem_alloc()
+        _meter = Meter()
+        _meter.start()
+
+
+def _gc_enable():
+    global _meter
+    if _meter is not None:
+        _meter.stop()
+        _meter = None
+    _gc_enable_builtin()
+
+
+def _mem_alloc():
+    if _meter is not None:
+        return _meter_base + _meter.allocated
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def _mem_free():
+    return 256 * 1024 - _mem_alloc()
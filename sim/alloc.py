@@ -0,0 +1,144 @@
+"""What firmware code allocates, for ``gc.mem_alloc()`` on the host.
+
+On the device, with the collector off, ``gc.mem_alloc()`` only grows,
+so two readings bracket what the code in between allocated. CPython
+frees most garbage by reference counting the moment it is dropped, so
+tracemalloc's traced memory only shows what is still held: an f-string
+built and thrown away every frame never appears in it. A Meter follows
+the firmware an opcode at a time instead, and adds up what each opcode
+leaves allocated, whether a later one frees it or not. Tuples, lists and dicts usually
+come from CPython's free lists, out of tracemalloc's sight, so the
+opcodes that build one count it at its CPython size regardless.
+
+Left out is what the device would not allocate either: a boxed int (a
+small int there), the range object and iterator of a for loop and the
+unpacking of a sequence (the device keeps those on the stack; traced
+CPython does not), and anything done inside the sim
+stand-ins or the standard library, which are C there. So are the
+arguments tuple and other temporaries a C function makes and drops
+within one call, and the frame objects tracing itself costs: for a call
+an opcode counts what it leaves allocated, for anything else the most it
+had allocated at once, since it may free an operand after making its
+result.
+"""
+
+import dis
+import os
+import sys
+import tracemalloc
+
+_FIRMWARE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Growth up to this is an int boxed on the host, not an allocation.
+_BOXED_INT_MAX = sys.getsizeof(1 << 30)
+_RANGE_SIZE = sys.getsizeof(range(0))
+_GET_ITER = dis.opmap['GET_ITER']
+_STACK_ONLY = (_GET_ITER, dis.opmap['UNPACK_SEQUENCE'])
+_CALLS = (dis.opmap['CALL'], dis.opmap['CALL_FUNCTION_EX'])
+# Opcode: (size of an empty one, size per item in the argument).
+_BUILDS = {
+    dis.opmap['BUILD_TUPLE']: (sys.getsizeof(()), 8),
+    dis.opmap['BUILD_LIST']: (sys.getsizeof([]), 8),
+    dis.opmap['BUILD_MAP']: (sys.getsizeof({}), 0),
+    dis.opmap['BUILD_CONST_KEY_MAP']: (sys.getsizeof({}), 0),
+    dis.opmap['BUILD_SET']: (sys.getsizeof(set()), 0),
+}
+
+
+class Meter:
+    """Counts firmware allocations on this thread between start() and stop()."""
+
+    def __init__(self):
+        self.allocated = 0
+        self.running = False
+        self._base = 0
+        self._outside = None
+        self._skip = False
+        self._last_op = None
+        self._last_arg = 0
+        self._started_tracemalloc = False
+        # code object: its bytecode, or None outside the firmware.
+        self._code = {}
+        # Bound once: a fresh bound method per event would count as an
+        # allocation of the firmware's.
+        self._call_tracer = self._on_call
+        self._opcode_tracer = self._on_opcode
+        self._outside_tracer = self._on_outside_event
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self.running = True
+        self._outside = None
+        self._skip = True
+        self._mark()
+        sys.settrace(self._call_tracer)
+
+    def stop(self):
+        sys.settrace(None)
+        self.running = False
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _mark(self):
+        # Last thing before returning to the firmware.
+        self._base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+    def _bytecode(self, code):
+        try:
+            return self._code[code]
+        except KeyError:
+            # Modules at the top of the repository are the firmware.
+            inside = os.path.dirname(os.path.abspath(code.co_filename)) == _FIRMWARE_DIR
+            bytecode = self._code[code] = code.co_code if inside else None
+            return bytecode
+
+    def _on_call(self, frame, event, arg):
+        if self._outside is not None:
+            # Inside a stand-in or the library: none of it is counted, nor
+            # any firmware it calls back.
+            return None
+        # What the call made before getting here is the frame object and
+        # locals tracing needs; the callee's own work is counted as it runs.
+        frame.f_trace_lines = False
+        self._last_op = None
+        if self._bytecode(frame.f_code) is None:
+            self._outside = frame
+            self._mark()
+            return self._outside_tracer
+        frame.f_trace_opcodes = True
+        self._skip = False
+        self._mark()
+        return self._opcode_tracer
+
+    def _on_opcode(self, frame, event, arg):
+        current, peak = tracemalloc.get_traced_memory()
+        grown = (current if self._last_op in _CALLS else peak) - self._base
+        next_op = next_arg = None
+        if event == 'opcode':
+            bytecode = self._bytecode(frame.f_code)
+            next_op = bytecode[frame.f_lasti]
+            next_arg = bytecode[frame.f_lasti + 1]
+        build = _BUILDS.get(self._last_op)
+        if build is not None:
+            grown = max(grown, build[0] + build[1] * self._last_arg)
+        if grown > _BOXED_INT_MAX and not self._skip and self._last_op not in _STACK_ONLY \
+                and not (next_op == _GET_ITER and grown == _RANGE_SIZE):
+            self.allocated += grown
+        # Between a return and the caller's next opcode only the callee's
+        # frame is torn down.
+        self._skip = event == 'return'
+        self._last_op = next_op
+        self._last_arg = next_arg
+        del current, peak, grown, next_arg
+        self._mark()
+        return self._opcode_tracer
+
+    def _on_outside_event(self, frame, event, arg):
+        if event == 'return' and frame is self._outside:
+            self._outside = None
+            self._skip = True
+            self._mark()
+        return self._outside_tracer
@@ -0,0 +1,115 @@
+import time as _time
+
+_TICKS_PERIOD = 1 << 30
+_TICKS_MAX = _TICKS_PERIOD - 1
+_TICKS_HALF = _TICKS_PERIOD // 2
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & _TICKS_MAX
+
+
+def ticks_diff(end, start):
+    return ((end - start + _TICKS_HALF) & _TICKS_MAX) - _TICKS_HALF
+
+
+class VirtualClock:
+    """The clock behind the ``time.ticks_*`` and ``machine.Timer`` stand-ins.
+
+    A running clock follows the host's monotonic clock, which is what
+    benchmarks want. A frozen clock only moves on ``advance()`` or
+    ``sleep_ms()``, so hours of firmware time can pass in a few host
+    milliseconds. Either way ``advance()`` jumps forward and fires the
+    ``machine.Timer`` callbacks that fall due, in deadline order.
+    """
+
+    def __init__(self, frozen=False):
+        self.frozen = frozen
+        self._offset_us = 0
+        self._base_ns = _time.perf_counter_ns()
+        self._timers = []
+
+    def now_us(self):
+        if self.frozen:
+            return self._offset_us
+        return self._offset_us + (_time.perf_counter_ns() - self._base_ns) // 1000
+
+    def ticks_ms(self):
+        return (self.now_us() // 1000) & _TICKS_MAX
+
+    def ticks_us(self):
+        return self.now_us() & _TICKS_MAX
+
+    def advance(self, ms):
+        self.advance_us(ms * 1000)
+
+    def advance_us(self, us):
+        target = self.now_us() + us
+        self._fire_timers(target)
+        self._move_to(target)
+
+    def sleep_ms(self, ms):
+        if self.frozen:
+            self.advance(ms)
+        else:
+            _time.sleep(ms / 1000)
+            self.run_due()
+
+    def sleep_us(self, us):
+        if self.frozen:
+            self.advance_us(us)
+        else:
+            _time.sleep(us / 1_000_000)
+            self.run_due()
+
+    def run_due(self):
+        self._fire_timers(self.now_us())
+
+    def next_timer_us(self):
+        due = [timer._due_us for timer in self._timers if timer._due_us is not None]
+        return min(due) if due else None
+
+    def add_timer(self, timer):
+        if timer not in self._timers:
+            self._timers.append(timer)
+
+    def remove_timer(self, timer):
+        if timer in self._timers:
+            self._timers.remove(timer)
+
+    def _fire_timers(self, target_us):
+        while True:
+            due_us = self.next_timer_us()
+            if due_us is None or due_us > target_us:
+                return
+            self._move_to(due_us)
+            for timer in self._timers:
+                if timer._due_us == due_us:
+                    timer._fire()
+                    break
+
+    def _move_to(self, us):
+        now = self.now_us()
+        if us > now:
+            self._offset_us += us - now
+
+
+_clock = VirtualClock()
+
+
+def current():
+    return _clock
+
+
+def install(clock):
+    """Make ``clock`` the one read by ``time.ticks_*`` and ``machine.Timer``."""
+    global _clock
+    _clock = clock
+    _time.ticks_ms = lambda: _clock.ticks_ms()
+    _time.ticks_us = lambda: _clock.ticks_us()
+    _time.ticks_cpu = lambda: _clock.ticks_us()
+    _time.ticks_add = ticks_add
+    _time.ticks_diff = ticks_diff
+    _time.sleep_ms = lambda ms: _clock.sleep_ms(ms)
+    _time.sleep_us = lambda us: _clock.sleep_us(us)
+    return clock
@@ -0,0 +1,54 @@
+"""File-backed stand-in for a flash block device such as ``rp2.Flash``.
+
+It speaks the extended block protocol and keeps NOR semantics: erase
+sets a whole block to 0xff and programming can only clear bits, so a
+write over data that was not erased shows up as corrupt records rather
+than silently succeeding.
+"""
+
+import os
+
+
+class FileFlash:
+    def __init__(self, path, block_size=4096, blocks=4):
+        self.path = path
+        self.block_size = block_size
+        self.blocks = blocks
+        self.erases = [0] * blocks
+        self.programs = 0
+        size = block_size * blocks
+        if not os.path.exists(path) or os.path.getsize(path) != size:
+            with open(path, 'wb') as f:
+                f.write(b'\xff' * size)
+
+    def readblocks(self, block, buf, offset=0):
+        with open(self.path, 'rb') as f:
+            f.seek(block * self.block_size + offset)
+            data = f.read(len(buf))
+        buf[:len(data)] = data
+
+    def writeblocks(self, block, buf, offset=None):
+        # Without an offset the block is erased first, as rp2.Flash does.
+        if offset is None:
+            self.ioctl(6, block)
+            offset = 0
+        start = block * self.block_size + offset
+        with open(self.path, 'r+b') as f:
+            f.seek(start)
+            old = f.read(len(buf))
+            f.seek(start)
+            f.write(bytes(a & b for a, b in zip(old, buf)))
+        self.programs += 1
+
+    def ioctl(self, op, arg):
+        if op == 4:
+            return self.blocks
+        if op == 5:
+            return self.block_size
+        if op == 6:
+            with open(self.path, 'r+b') as f:
+                f.seek(arg * self.block_size)
+                f.write(b'\xff' * self.block_size)
+            self.erases[arg] += 1
+            return 0
+        return None
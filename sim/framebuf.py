@@ -0,0 +1,157 @@
+"""Pure-Python stand-in for ``framebuf`` covering the MONO_HMSB format."""
+
+MONO_VLSB = 0
+RGB565 = 1
+GS4_HMSB = 2
+MONO_HLSB = 3
+MONO_HMSB = 4
+GS2_HMSB = 5
+GS8 = 6
+
+
+class FrameBuffer:
+    def __init__(self, buffer, width, height, format, stride=None):
+        if format != MONO_HMSB:
+            raise ValueError('only MONO_HMSB is simulated')
+        # Like the device, a FrameBuffer needs a writable buffer; read-only
+        # ones can only be blitted from as a (buffer, w, h, format) tuple.
+        if isinstance(buffer, bytes):
+            raise TypeError('object with buffer protocol required')
+        self._init(buffer, width, height, stride)
+
+    def _init(self, buffer, width, height, stride):
+        self._buf = buffer
+        self._width = width
+        self._height = height
+        self._row_bytes = ((width if stride is None else stride) + 7) // 8
+        if len(buffer) < self._row_bytes * height:
+            raise ValueError('buffer too small')
+
+    # MONO_HMSB packs eight horizontal pixels per byte, bit 0 leftmost.
+
+    def pixel(self, x, y, c=None):
+        if not (0 <= x < self._width and 0 <= y < self._height):
+            return None
+        index = y * self._row_bytes + (x >> 3)
+        mask = 1 << (x & 7)
+        if c is None:
+            return 1 if self._buf[index] & mask else 0
+        if c & 1:
+            self._buf[index] |= mask
+        else:
+            self._buf[index] &= ~mask & 0xff
+
+    def fill(self, c):
+        self.fill_rect(0, 0, self._width, self._height, c)
+
+    def fill_rect(self, x, y, w, h, c):
+        x0 = max(0, x)
+        y0 = max(0, y)
+        x1 = min(self._width, x + w)
+        y1 = min(self._height, y + h)
+        if x0 >= x1 or y0 >= y1:
+            return
+        # Per-byte masks for the span, then apply them to every row.
+        spans = []
+        for byte in range(x0 >> 3, ((x1 - 1) >> 3) + 1):
+            lo = max(x0, byte * 8) - byte * 8
+            hi = min(x1, byte * 8 + 8) - byte * 8
+            spans.append((byte, ((1 << hi) - 1) & ~((1 << lo) - 1)))
+        buf = self._buf
+        for row in range(y0, y1):
+            base = row * self._row_bytes
+            for byte, mask in spans:
+                if c & 1:
+                    buf[base + byte] |= mask
+                else:
+                    buf[base + byte] &= ~mask & 0xff
+
+    def hline(self, x, y, w, c):
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self.fill_rect(x, y, 1, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            self.fill_rect(x, y, w, h, c)
+            return
+        self.hline(x, y, w, c)
+        self.hline(x, y + h - 1, w, c)
+        self.vline(x, y, h, c)
+        self.vline(x + w - 1, y, h, c)
+
+    def line(self, x1, y1, x2, y2, c):
+        dx = abs(x2 - x1)
+        dy = -abs(y2 - y1)
+        sx = 1 if x1 < x2 else -1
+        sy = 1 if y1 < y2 else -1
+        err = dx + dy
+        while True:
+            self.pixel(x1, y1, c)
+            if x1 == x2 and y1 == y2:
+                return
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x1 += sx
+            if e2 <= dx:
+                err += dx
+                y1 += sy
+
+    def blit(self, fbuf, x, y, key=-1, palette=None):
+        if isinstance(fbuf, (tuple, list)):
+            buffer, width, height, format = fbuf[:4]
+            if format != MONO_HMSB:
+                raise ValueError('only MONO_HMSB is simulated')
+            source = FrameBuffer.__new__(FrameBuffer)
+            source._init(buffer, width, height, fbuf[4] if len(fbuf) > 4 else None)
+            fbuf = source
+        if palette is None and key in (-1, 0, 1):
+            self._blit_rows(fbuf, x, y, key)
+            return
+        self._blit_pixels(fbuf, x, y, key, palette)
+
+    def _blit_rows(self, fbuf, x, y, key):
+        # A row at a time as integers; bit 0 is the leftmost pixel, so a
+        # little-endian row is the pixels in order.
+        x0 = max(0, -x)
+        x1 = min(fbuf._width, self._width - x)
+        if x0 >= x1:
+            return
+        mask = (1 << (x1 - x0)) - 1
+        left = x + x0
+        first = left >> 3
+        count = ((left + x1 - x0 - 1) >> 3) + 1 - first
+        shift = left & 7
+        window = mask << shift
+        keep = (1 << (8 * count)) - 1
+        src = fbuf._buf
+        dst = self._buf
+        for sy in range(max(0, -y), min(fbuf._height, self._height - y)):
+            start = sy * fbuf._row_bytes
+            bits = ((int.from_bytes(src[start:start + fbuf._row_bytes], 'little') >> x0) & mask) << shift
+            start = (y + sy) * self._row_bytes + first
+            row = int.from_bytes(dst[start:start + count], 'little')
+            if key == 0:
+                row |= bits
+            elif key == 1:
+                row &= bits | ~window
+            else:
+                row = (row & ~window) | bits
+            dst[start:start + count] = (row & keep).to_bytes(count, 'little')
+
+    def _blit_pixels(self, fbuf, x, y, key, palette):
+        for sy in range(max(0, -y), min(fbuf._height, self._height - y)):
+            for sx in range(max(0, -x), min(fbuf._width, self._width - x)):
+                c = fbuf.pixel(sx, sy)
+                if c != key:
+                    if palette is not None:
+                        c = palette.pixel(c, 0)
+                    self.pixel(x + sx, y + sy, c)
+
+    def scroll(self, xstep, ystep):
+        raise NotImplementedError('scroll is not simulated')
+
+    def text(self, s, x, y, c=1):
+        raise NotImplementedError('text is not simulated')
@@ -0,0 +1,171 @@
+"""Stand-in for the parts of ``machine`` the firmware uses."""
+
+from sim import clock as _clock
+from sim import pins as _pins
+from sim.spi import SPIRecorder
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = _pins.PinBank.IRQ_FALLING
+    IRQ_RISING = _pins.PinBank.IRQ_RISING
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self._line = _pins.current().line(id)
+        if self._line.pin is None:
+            self._line.pin = self
+            if pull == Pin.PULL_UP:
+                self._line.value = 1
+        if value is not None:
+            self._line.value = 1 if value else 0
+
+    def __call__(self, value=None):
+        return self.value(value)
+
+    def value(self, value=None):
+        if value is None:
+            return self._line.value
+        self._line.value = 1 if value else 0
+
+    def on(self):
+        self._line.value = 1
+
+    def off(self):
+        self._line.value = 0
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False, wake=None):
+        self._line.pin = self
+        self._line.handler = handler
+        self._line.trigger = trigger if handler else 0
+
+
+# RP2040 register addresses of the peripherals above, for the rp2.DMA and
+# mem32 stand-ins.
+SPI_BASES = (0x4003c000, 0x40040000)
+_SSPDR = 0x008
+_SSPSR = 0x00c
+# TX FIFO empty and not full, not busy: a stand-in transfer is over when it ends.
+_SSPSR_IDLE = 0x03
+
+# Data register address -> the stand-in that receives what DMA writes there.
+peripherals = {}
+
+
+class SPI(SPIRecorder):
+    def __init__(self, id, baudrate=1_000_000, polarity=0, phase=0, bits=8, firstbit=0,
+                 sck=None, mosi=None, miso=None):
+        super().__init__(baudrate=baudrate)
+        self.id = id
+        peripherals[SPI_BASES[id] + _SSPDR] = self
+
+
+class PWM:
+    def __init__(self, dest, freq=None, duty_u16=None):
+        self.pin = dest
+        self._freq = 0
+        self._duty = 0
+        self.active = False
+        # How often the firmware touched the peripheral, to catch redundant
+        # reprogramming.
+        self.writes = 0
+        if freq is not None:
+            self.freq(freq)
+        if duty_u16 is not None:
+            self.duty_u16(duty_u16)
+
+    def freq(self, value=None):
+        if value is None:
+            return self._freq
+        self._freq = value
+        self.active = True
+        self.writes += 1
+
+    def duty_u16(self, value=None):
+        if value is None:
+            return self._duty
+        self._duty = value
+        self.active = True
+        self.writes += 1
+
+    def deinit(self):
+        self.active = False
+        self.writes += 1
+
+
+class ADC:
+    def __init__(self, id):
+        self.id = id
+        self.value = 0
+
+    def read_u16(self):
+        return self.value
+
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwargs):
+        self.id = id
+        self._due_us = None
+        self._period_us = 0
+        self._mode = Timer.PERIODIC
+        self._callback = None
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, mode=PERIODIC, freq=-1, period=-1, callback=None):
+        if freq > 0:
+            self._period_us = 1_000_000 // freq
+        else:
+            self._period_us = max(0, period) * 1000
+        self._mode = mode
+        self._callback = callback
+        clock = _clock.current()
+        self._due_us = clock.now_us() + self._period_us
+        clock.add_timer(self)
+
+    def deinit(self):
+        self._due_us = None
+        _clock.current().remove_timer(self)
+
+    def _fire(self):
+        if self._mode == Timer.PERIODIC and self._period_us > 0:
+            self._due_us += self._period_us
+        else:
+            self.deinit()
+        if self._callback:
+            self._callback(self)
+
+
+class _Memory:
+    """``mem32``: reads the status registers of the stand-ins above."""
+
+    def __getitem__(self, address):
+        for base in SPI_BASES:
+            if address == base + _SSPSR:
+                return _SSPSR_IDLE
+        raise ValueError('no stand-in for register 0x{:08x}'.format(address))
+
+
+mem32 = _Memory()
+
+
+def freq(hz=None):
+    return 125_000_000
+
+
+# Every lightsleep() call as the requested time in ms, None for "until an
+# IRQ"; the stand-in returns at once when no time is given.
+lightsleeps = []
+
+
+def lightsleep(time_ms=None):
+    lightsleeps.append(time_ms)
+    if time_ms is not None:
+        _clock.current().sleep_ms(time_ms)
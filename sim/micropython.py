@@ -0,0 +1,38 @@
+"""Stand-in for the ``micropython`` module.
+
+The code emitters are no-ops, so ``@native``/``@viper`` functions run as
+plain Python. ``schedule()`` queues callbacks like the firmware's
+scheduler; they run when ``run_scheduled()`` is called.
+"""
+
+SCHEDULER_DEPTH = 8
+
+_scheduled = []
+
+
+def const(value):
+    return value
+
+
+def native(func):
+    return func
+
+
+def viper(func):
+    return func
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def schedule(func, arg):
+    if len(_scheduled) >= SCHEDULER_DEPTH:
+        raise RuntimeError('schedule queue full')
+    _scheduled.append((func, arg))
+
+
+def run_scheduled():
+    while _scheduled:
+        func, arg = _scheduled.pop(0)
+        func(arg)
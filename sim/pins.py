@@ -0,0 +1,88 @@
+from sim import clock as _clock
+from sim import micropython
+
+# (CLK, DT) levels for one detent, starting from and returning to the idle
+# 1/1 of a pulled-up encoder. One line changes per step.
+_CW = ((1, 0), (0, 0), (0, 1), (1, 1))
+_CCW = ((0, 1), (0, 0), (1, 0), (1, 1))
+
+
+class Line:
+    def __init__(self, id):
+        self.id = id
+        self.value = 0
+        self.handler = None
+        self.trigger = 0
+        self.pin = None
+
+
+class PinBank:
+    """Virtual GPIO lines shared by every ``machine.Pin`` with the same id.
+
+    ``set()`` changes a line the way the outside world would, running its
+    IRQ handler straight away on a matching edge and then anything the
+    handler scheduled, as the firmware would see it.
+    """
+
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self):
+        self.lines = {}
+        self.edges = 0
+        self.on_edge = None
+
+    def line(self, id):
+        line = self.lines.get(id)
+        if line is None:
+            line = self.lines[id] = Line(id)
+        return line
+
+    def value(self, id):
+        return self.line(id).value
+
+    def set(self, id, value):
+        line = self.line(id)
+        value = 1 if value else 0
+        if value == line.value:
+            return
+        line.value = value
+        self.edges += 1
+        if self.on_edge:
+            self.on_edge(id, value)
+        trigger = self.IRQ_RISING if value else self.IRQ_FALLING
+        if line.handler and line.trigger & trigger:
+            line.handler(line.pin)
+        micropython.run_scheduled()
+
+    def turn(self, clk, dt, detents=1, gap_ms=0):
+        """Turn an encoder on ``clk``/``dt`` by ``detents``; negative is CCW.
+
+        ``gap_ms`` of clock time passes before each detent and is spread
+        over its four edges.
+        """
+        sequence = _CW if detents > 0 else _CCW
+        for _ in range(abs(detents)):
+            for clk_value, dt_value in sequence:
+                _clock.current().advance_us(gap_ms * 250)
+                self.set(clk, clk_value)
+                self.set(dt, dt_value)
+
+    def press(self, id, hold_ms=80, active=0):
+        """Press and release an active-low key, holding it for ``hold_ms``."""
+        self.set(id, active)
+        _clock.current().advance(hold_ms)
+        self.set(id, 1 - active)
+
+
+_bank = PinBank()
+
+
+def current():
+    return _bank
+
+
+def install(bank):
+    global _bank
+    _bank = bank
+    return bank
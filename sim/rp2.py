@@ -0,0 +1,76 @@
+"""Stand-in for the parts of ``rp2`` the firmware uses."""
+
+from sim import clock as _clock
+from sim import machine as _machine
+
+
+class DMA:
+    """A DMA channel feeding a peripheral stand-in's data register.
+
+    A triggered transfer stays active for as long as its bytes take on the
+    peripheral's bus, in ``VirtualClock`` time, and is delivered with one
+    ``write()`` when it ends. The source is read at that point as well, so
+    a buffer changed while its transfer runs is counted in ``torn``.
+    """
+
+    def __init__(self):
+        self._due_us = None
+        self._handler = None
+        self._read = None
+        self._write = None
+        self._count = 0
+        self._snapshot = None
+        self.transfers = 0
+        self.busy_us = 0
+        self.torn = 0
+
+    def pack_ctrl(self, default=None, **kwargs):
+        ctrl = dict(default or {})
+        ctrl.update(kwargs)
+        return ctrl
+
+    def config(self, read=None, write=None, count=None, ctrl=None, trigger=False):
+        if self.active():
+            raise OSError('DMA channel busy')
+        if read is not None:
+            self._read = read
+        if write is not None:
+            self._write = write
+        if count is not None:
+            self._count = count
+        if trigger:
+            self._start()
+
+    def active(self, value=None):
+        if value is not None:
+            raise NotImplementedError('only triggering through config() is simulated')
+        return self._due_us is not None
+
+    def irq(self, handler=None, hard=False):
+        self._handler = handler
+
+    def close(self):
+        if self._due_us is not None:
+            self._due_us = None
+            _clock.current().remove_timer(self)
+        self._handler = None
+
+    def _start(self):
+        target = _machine.peripherals[self._write]
+        self._snapshot = bytes(memoryview(self._read)[:self._count])
+        duration_us = self._count * 8 * 1_000_000 // target.baudrate
+        clock = _clock.current()
+        self._due_us = clock.now_us() + duration_us
+        clock.add_timer(self)
+        self.transfers += 1
+        self.busy_us += duration_us
+
+    def _fire(self):
+        data = bytes(memoryview(self._read)[:self._count])
+        if data != self._snapshot:
+            self.torn += 1
+        self._due_us = None
+        _clock.current().remove_timer(self)
+        _machine.peripherals[self._write].write(data)
+        if self._handler is not None:
+            self._handler(self)
@@ -0,0 +1,154 @@
+"""Run the firmware headless on the host.
+
+    python -m sim.run [seconds] [--dma | --worker] [--timers N]
+
+Builds OLED, Rotary and State on the stand-ins under a frozen clock and
+runs runtime.Runtime on them in virtual time. It sets a timer with the
+knob and starts it with the key, through the virtual pins, and lets the
+runtime draw whatever frames it decides to. Prints frame-time and allocation statistics
+and the last frame. With --dma the panel is flushed through the rp2.DMA
+stand-in, and the report shows how much of the bus time overlapped with
+the firmware instead of being waited for. With --worker frames go out
+from OLED's flush worker on a host thread, and after every frame the
+panel's copy is checked against the framebuffer. With --timers N (default 1)
+the state has N timers, as main.TIMER_COUNT sets on the device: the
+screen shows the compact rows, and a double-click first selects the
+second timer, which is then set and started.
+"""
+
+import sys
+import time
+import tracemalloc
+
+import sim
+
+ROTARY_CLK = 18
+ROTARY_DT = 19
+KEY = 20
+
+
+def build(clock=None, timer_count=1):
+    clock, bank = sim.install(clock or sim.clock.VirtualClock(frozen=True))
+    from kitchen import OLED, Rotary, State
+
+    rotary = Rotary()
+    display = OLED()
+    state = State(pause_icon=None, segmented_text=None, display=display, rotary=rotary,
+                  timer_count=timer_count)
+    return state, display, clock, bank
+
+
+def render_ascii(display):
+    rows = []
+    for y in range(0, display.height, 2):
+        rows.append(''.join('#' if display.pixel(x, y) else '.' for x in range(0, display.width, 2)))
+    return '\n'.join(rows)
+
+
+def settle(display):
+    """Wait until the flush worker has sent everything handed over to it."""
+    while True:
+        with display.hold_bus():
+            # _frame_ready is held again once the worker has taken the last
+            # frame, and it empties the row window when it has sent it.
+            if display._frame_ready.locked() and display._front_lo == 64:
+                return
+        time.sleep(0.0002)
+
+
+async def press(bank, hold_ms=80):
+    """Press and release the key, holding it for hold_ms of clock time."""
+    from sim import uasyncio as asyncio
+    bank.set(KEY, 0)
+    await asyncio.sleep_ms(hold_ms)
+    bank.set(KEY, 1)
+
+
+async def double_click(bank):
+    from kitchen import Key
+    from sim import uasyncio as asyncio
+    await press(bank)
+    await asyncio.sleep_ms(100)
+    await press(bank)
+    # Recognised once no third press follows.
+    await asyncio.sleep_ms(Key.DOUBLE_CLICK_MS + Key.DEBOUNCE_MS)
+
+
+def run(seconds=90, dma=False, timers=1, worker=False):
+    state, display, clock, bank = build(timer_count=timers)
+    if dma:
+        from panel_dma import DMAFlush
+        display.start_dma(DMAFlush(display))
+    elif worker:
+        display.start_worker()
+    from runtime import Runtime
+    from sim import uasyncio as asyncio
+
+    frame_us = []
+    frame_alloc = []
+    worker_mismatches = 0
+    frame = state.frame
+
+    def measured_frame():
+        nonlocal worker_mismatches
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter_ns()
+        frame()
+        frame_us.append((time.perf_counter_ns() - start) // 1000)
+        frame_alloc.append(tracemalloc.get_traced_memory()[1] - before)
+        if worker:
+            settle(display)
+            worker_mismatches += display._shadow != display.buffer
+
+    async def session():
+        task = asyncio.create_task(Runtime(state, display).run())
+        if timers > 1:
+            await double_click(bank)
+        for _ in range(2):
+            await asyncio.sleep_ms(300)
+            bank.turn(ROTARY_CLK, ROTARY_DT, detents=-1)
+        await asyncio.sleep_ms(300)
+        await press(bank)
+        # Only the frames of the running timer are measured.
+        state.frame = measured_frame
+        tracemalloc.start()
+        await asyncio.sleep_ms(seconds * 1000)
+        tracemalloc.stop()
+        task.cancel()
+
+    asyncio.run(session())
+    if worker:
+        display.stop_worker()
+
+    frame_us.sort()
+    print('frames: {}  over {} s of clock time'.format(len(frame_us), seconds))
+    print('frame time us: median {}  p95 {}  max {}'.format(
+        frame_us[len(frame_us) // 2], frame_us[len(frame_us) * 95 // 100], frame_us[-1]))
+    print('allocated bytes per frame: max {}'.format(max(frame_alloc)))
+    print('SPI: {} transactions, {} bytes'.format(display.spi.transactions, display.spi.bytes_written))
+    if dma:
+        backend = display._dma
+        busy_us = backend._dma.busy_us
+        print('DMA: {} transfers, {} bytes, {} us on the bus, {} us of it waited for'.format(
+            backend.transfers, backend.bytes_sent, busy_us, backend.wait_us))
+    if worker:
+        print('worker: {} frames where the panel differed from the framebuffer'.format(worker_mismatches))
+    if timers > 1:
+        print('timers: {}, selected {}, set to {} s'.format(
+            timers, state.timers.selected, [state.timers[i].duration_ms // 1000 for i in range(timers)]))
+    print('beep: {} PWM writes, sounding {}'.format(state.beep._pwm.writes, state.beep.is_enabled))
+    print(render_ascii(display))
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    timers = 1
+    if '--timers' in args:
+        at = args.index('--timers')
+        timers = int(args[at + 1])
+        del args[at:at + 2]
+    dma = '--dma' in args
+    worker = '--worker' in args
+    args = [arg for arg in args if arg not in ('--dma', '--worker')]
+    run(int(args[0]) if args else 90, dma=dma, timers=timers, worker=worker)
@@ -0,0 +1,66 @@
+"""In-memory serial link for talking to the firmware on the host.
+
+A Pipe is one direction of a USB serial port: the firmware writes to it
+without blocking, up to ``capacity`` bytes in flight, and the host reads
+from it like a pyserial port with a timeout. A Loopback is a pair of them.
+"""
+
+import threading
+import time
+
+
+class Pipe:
+    def __init__(self, capacity=None):
+        self.capacity = capacity
+        self._buf = bytearray()
+        self._cond = threading.Condition()
+        self.bytes_written = 0
+
+    def writable(self):
+        return self.capacity is None or len(self._buf) < self.capacity
+
+    def write(self, data):
+        with self._cond:
+            room = len(data) if self.capacity is None else max(0, self.capacity - len(self._buf))
+            data = bytes(data[:room])
+            self._buf += data
+            self.bytes_written += len(data)
+            self._cond.notify_all()
+            return len(data)
+
+    def read(self, n, timeout=None):
+        """Return up to n bytes, waiting for at least one; b'' on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self._buf:
+                left = None if deadline is None else deadline - time.monotonic()
+                if left is not None and left <= 0:
+                    return b''
+                self._cond.wait(left)
+            data = bytes(self._buf[:n])
+            del self._buf[:n]
+            self._cond.notify_all()
+            return data
+
+    def readline(self):
+        with self._cond:
+            while b'\n' not in self._buf:
+                self._cond.wait()
+            end = self._buf.index(b'\n') + 1
+            data = bytes(self._buf[:end])
+            del self._buf[:end]
+            return data
+
+
+class Loopback:
+    """Both directions: the host writes to_device and reads from_device."""
+
+    def __init__(self, capacity=None):
+        self.to_device = Pipe()
+        self.from_device = Pipe(capacity)
+
+    def write(self, data):
+        return self.to_device.write(data)
+
+    def read(self, n, timeout=0.1):
+        return self.from_device.read(n, timeout)
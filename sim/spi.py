@@ -0,0 +1,25 @@
+class SPIRecorder:
+    """SPI stand-in that counts write transactions and bytes.
+
+    Every ``write()`` is one CS-framed transaction in ``OLED``, so the
+    counters map directly onto bus traffic. ``frame_time_us()`` turns them
+    into an estimate using the bus clock and a fixed per-transaction cost
+    for the CS/DC toggling and call overhead around each write.
+    """
+
+    def __init__(self, baudrate=20_000_000, transaction_overhead_us=20):
+        self.baudrate = baudrate
+        self.transaction_overhead_us = transaction_overhead_us
+        self.reset()
+
+    def write(self, buf):
+        self.transactions += 1
+        self.bytes_written += len(buf)
+
+    def reset(self):
+        self.transactions = 0
+        self.bytes_written = 0
+
+    def frame_time_us(self):
+        wire_us = self.bytes_written * 8 * 1_000_000 // self.baudrate
+        return wire_us + self.transactions * self.transaction_overhead_us
@@ -0,0 +1,21 @@
+"""Stand-in for MicroPython's ``_thread`` built on ``threading``.
+
+Locks may be released by a thread other than the one that acquired them,
+as on the device, so both sides of a producer/consumer handshake work.
+"""
+
+import threading
+
+
+def allocate_lock():
+    return threading.Lock()
+
+
+def start_new_thread(function, args, kwargs=None):
+    thread = threading.Thread(target=function, args=args, kwargs=kwargs or {}, daemon=True)
+    thread.start()
+    return thread.ident
+
+
+def get_ident():
+    return threading.get_ident()
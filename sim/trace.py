@@ -0,0 +1,263 @@
+"""Record and replay input traces against the firmware on the host.
+
+    python -m sim.trace record cook.trace [hours]
+    python -m sim.trace replay cook.trace
+
+A trace is the pin edges of a session and a checksum of every frame the
+display flushed, each stamped with the microseconds since the previous
+entry. Both recording and replay run ``runtime.Runtime`` on the
+virtual-time event loop of the uasyncio stand-in under a frozen clock,
+so hours of firmware time run as fast as the host can render. Replaying
+feeds the edges into the pin stand-ins at their recorded instants and
+checks that the runtime flushes the same frames at the same instants.
+
+Format: the magic b'KTR1', then entries of one tag byte, a varint time
+delta and a payload. Tags 0x00-0x3f are a falling edge on that pin,
+0x40-0x7f a rising one, 0x80 a frame followed by its CRC32 (4 bytes,
+little-endian) and 0x81 the end of the trace.
+"""
+
+import binascii
+import sys
+import time
+
+from sim import run
+
+MAGIC = b'KTR1'
+_RISING = 0x40
+_FRAME = 0x80
+_END = 0x81
+
+
+class Recorder:
+    """Appends the bank's edges and every state.frame() to a trace."""
+
+    def __init__(self, clock, bank, state):
+        self._clock = clock
+        self._bank = bank
+        self._state = state
+        self._display = state.display
+        self._last_us = clock.now_us()
+        self._out = bytearray(MAGIC)
+        self.edges = 0
+        self.frames = 0
+        bank.on_edge = self._on_edge
+        self._frame = frame = state.frame
+
+        def recorded_frame():
+            frame()
+            self._on_frame()
+
+        state.frame = recorded_frame
+
+    def stop(self):
+        """Detach and return the finished trace."""
+        self._bank.on_edge = None
+        self._state.frame = self._frame
+        self._entry(_END)
+        return bytes(self._out)
+
+    def _on_edge(self, pin, value):
+        self._entry((_RISING if value else 0) | pin)
+        self.edges += 1
+
+    def _on_frame(self):
+        self._entry(_FRAME)
+        self._out += binascii.crc32(self._display.buffer).to_bytes(4, 'little')
+        self.frames += 1
+
+    def _entry(self, tag):
+        now = self._clock.now_us()
+        delta = now - self._last_us
+        self._last_us = now
+        self._out.append(tag)
+        while True:
+            byte = delta & 0x7f
+            delta >>= 7
+            if delta:
+                self._out.append(byte | 0x80)
+            else:
+                self._out.append(byte)
+                return
+
+
+def entries(trace):
+    """Yield (delta_us, tag, crc) for each entry; crc is None except for frames."""
+    if trace[:4] != MAGIC:
+        raise ValueError('not a trace')
+    i = 4
+    while i < len(trace):
+        tag = trace[i]
+        delta = 0
+        shift = 0
+        while True:
+            i += 1
+            byte = trace[i]
+            delta |= (byte & 0x7f) << shift
+            shift += 7
+            if not byte & 0x80:
+                break
+        i += 1
+        crc = None
+        if tag == _FRAME:
+            crc = int.from_bytes(trace[i:i + 4], 'little')
+            i += 4
+        yield delta, tag, crc
+        if tag == _END:
+            return
+
+
+class ReplayResult:
+    def __init__(self):
+        self.frames = 0
+        self.edges = 0
+        self.mismatches = []
+        self.frame_us = []
+        self.clock_ms = 0
+        self.wall_ms = 0
+        self.alarm_at_ms = None
+
+    @property
+    def ok(self):
+        return not self.mismatches
+
+    def report(self):
+        frame_us = sorted(self.frame_us) or [0]
+        print('replayed {} frames, {} edges: {:.1f} h of clock time in {:.1f} s'.format(
+            self.frames, self.edges, self.clock_ms / 3_600_000, self.wall_ms / 1000))
+        print('frame time us: median {}  p95 {}  max {}'.format(
+            frame_us[len(frame_us) // 2], frame_us[len(frame_us) * 95 // 100], frame_us[-1]))
+        if self.alarm_at_ms is not None:
+            print('alarm at {} ms'.format(self.alarm_at_ms))
+        print('frame mismatches: {}'.format(len(self.mismatches)))
+        for index, at_ms in self.mismatches[:10]:
+            print('  frame {} at {} ms'.format(index, at_ms))
+
+
+class _Feeder:
+    """Sets the bank's lines at the instants of a trace's edges.
+
+    The clock fires it like a machine.Timer, so every edge lands on its
+    microsecond, and IRQs run from it as they would on the device.
+    """
+
+    def __init__(self, clock, bank, edges):
+        self._clock = clock
+        self._bank = bank
+        self._edges = edges
+        self._next = 0
+        self._due_us = None
+        self._arm()
+
+    def _arm(self):
+        if self._next < len(self._edges):
+            self._due_us = self._edges[self._next][0]
+            self._clock.add_timer(self)
+        else:
+            self._due_us = None
+            self._clock.remove_timer(self)
+
+    def _fire(self):
+        _, pin, value = self._edges[self._next]
+        self._next += 1
+        self._arm()
+        self._bank.set(pin, value)
+
+
+def replay(trace):
+    """Run trace against a freshly built firmware; returns a ReplayResult."""
+    state, display, clock, bank = run.build()
+    from runtime import Runtime
+    from sim import uasyncio as asyncio
+
+    result = ReplayResult()
+    start_us = clock.now_us()
+    at_us = start_us
+    edges = []
+    expected = []
+    for delta, tag, crc in entries(trace):
+        at_us += delta
+        if tag == _FRAME:
+            expected.append((at_us, crc))
+        elif tag != _END:
+            edges.append((at_us, tag & 0x3f, tag & _RISING))
+    end_us = at_us
+    frame = state.frame
+
+    def checked_frame():
+        begin = time.perf_counter_ns()
+        frame()
+        result.frame_us.append((time.perf_counter_ns() - begin) // 1000)
+        now_us = clock.now_us()
+        if result.alarm_at_ms is None and state.beep.is_enabled:
+            result.alarm_at_ms = (now_us - start_us) // 1000
+        if result.frames >= len(expected) or expected[result.frames] != (now_us, binascii.crc32(display.buffer)):
+            result.mismatches.append((result.frames, (now_us - start_us) // 1000))
+        result.frames += 1
+
+    state.frame = checked_frame
+    feeder = _Feeder(clock, bank, edges)
+
+    async def until_end():
+        task = asyncio.create_task(Runtime(state, display).run())
+        await asyncio.sleep((end_us - clock.now_us()) / 1_000_000)
+        task.cancel()
+
+    wall = time.perf_counter_ns()
+    asyncio.run(until_end())
+    result.edges = feeder._next
+    # Frames the runtime never got to are mismatches too.
+    for index in range(result.frames, len(expected)):
+        result.mismatches.append((index, (expected[index][0] - start_us) // 1000))
+    result.clock_ms = (end_us - start_us) // 1000
+    result.wall_ms = (time.perf_counter_ns() - wall) // 1_000_000
+    return result
+
+
+def record_cook(hours=12):
+    """Record a scripted cook: set the knob to hours, start, wait for the alarm, silence it."""
+    state, display, clock, bank = run.build()
+    from runtime import Runtime
+    from sim import uasyncio as asyncio
+
+    recorder = Recorder(clock, bank, state)
+
+    async def cook():
+        task = asyncio.create_task(Runtime(state, display).run())
+        # Fast turns count for several detents; finish with single ones.
+        target = min(hours * 3600, 12 * 3600)
+        while state.timer.alarm_in < target:
+            left = target - state.timer.alarm_in
+            await asyncio.sleep_ms(30 if left > 1800 else 300)
+            bank.turn(run.ROTARY_CLK, run.ROTARY_DT, detents=-1)
+        await run.press(bank)
+        while not state.beep.is_enabled:
+            await asyncio.sleep_ms(1000)
+        await asyncio.sleep_ms(3000)
+        await run.press(bank)
+        await asyncio.sleep_ms(1000)
+        task.cancel()
+
+    asyncio.run(cook())
+    return recorder.stop()
+
+
+def main(argv):
+    if len(argv) >= 2 and argv[0] == 'record':
+        hours = float(argv[2]) if len(argv) > 2 else 12
+        trace = record_cook(hours)
+        with open(argv[1], 'wb') as f:
+            f.write(trace)
+        print('wrote {}: {} bytes'.format(argv[1], len(trace)))
+        return 0
+    if len(argv) == 2 and argv[0] == 'replay':
+        with open(argv[1], 'rb') as f:
+            result = replay(f.read())
+        result.report()
+        return 0 if result.ok else 1
+    print(__doc__)
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
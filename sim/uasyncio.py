@@ -0,0 +1,147 @@
+"""Stand-in for ``uasyncio`` on top of CPython's asyncio.
+
+Under a running ``VirtualClock`` the event loop runs on host time, and
+run() fires due ``machine.Timer`` callbacks, as the device's timer IRQs
+would. Under a frozen one it runs on the clock instead: whenever every
+task is waiting, the clock jumps to the next sleep or ``machine.Timer``
+deadline, firing the timers on the way, so hours of firmware time pass
+as fast as the tasks can run. StreamReader reads its blocking stream on
+a worker thread.
+"""
+
+import asyncio as _asyncio
+import selectors as _selectors
+import threading as _threading
+from asyncio import (CancelledError, Event, Lock, TimeoutError, create_task, gather,  # noqa: F401
+                     get_event_loop, sleep, wait_for)
+
+from sim import clock as _clock
+
+
+def run(main):
+    clock = _clock.current()
+    if clock.frozen:
+        with _asyncio.Runner(loop_factory=lambda: _VirtualTimeLoop(clock)) as runner:
+            return runner.run(main)
+
+    async def with_timers():
+        timers = _asyncio.create_task(_run_timers())
+        try:
+            return await main
+        finally:
+            timers.cancel()
+
+    return _asyncio.run(with_timers())
+
+
+async def _run_timers():
+    while True:
+        _clock.current().run_due()
+        await _asyncio.sleep(0.001)
+
+
+class _VirtualTimeSelector:
+    """Wraps a selector so that waiting for a timeout advances the clock."""
+
+    def __init__(self, selector, clock):
+        self._selector = selector
+        self._clock = clock
+
+    def select(self, timeout=None):
+        # Wake-ups from other threads first, without waiting.
+        events = self._selector.select(0)
+        if events or timeout == 0:
+            return events
+        now = self._clock.now_us()
+        target = None if timeout is None else now + round(timeout * 1_000_000)
+        due = self._clock.next_timer_us()
+        if due is not None and (target is None or due < target):
+            target = due
+        if target is None:
+            # Nothing will ever fall due; only another thread can help.
+            return self._selector.select(None)
+        self._clock.advance_us(max(0, target - now))
+        return []
+
+    def __getattr__(self, name):
+        return getattr(self._selector, name)
+
+
+class _VirtualTimeLoop(_asyncio.SelectorEventLoop):
+    def __init__(self, clock):
+        self._clock = clock
+        super().__init__(_VirtualTimeSelector(_selectors.DefaultSelector(), clock))
+
+    def time(self):
+        return self._clock.now_us() / 1_000_000
+
+
+async def sleep_ms(ms):
+    await _asyncio.sleep(ms / 1000)
+
+
+async def wait_for_ms(aw, timeout):
+    return await _asyncio.wait_for(aw, timeout / 1000)
+
+
+class ThreadSafeFlag:
+    """Single-waiter flag that may be set from IRQ handlers or other threads."""
+
+    def __init__(self):
+        self._event = _asyncio.Event()
+        self._loop = None
+        self._thread = None
+
+    def set(self):
+        if self._loop is None or _threading.get_ident() == self._thread:
+            self._event.set()
+        else:
+            self._loop.call_soon_threadsafe(self._event.set)
+
+    def clear(self):
+        self._event.clear()
+
+    async def wait(self):
+        self._loop = _asyncio.get_running_loop()
+        self._thread = _threading.get_ident()
+        await self._event.wait()
+        self._event.clear()
+
+
+class StreamReader:
+    """Reads from a blocking stream without holding up the event loop."""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    async def _call(self, fn, *args):
+        # A daemon thread per read, so a read that never returns does not
+        # keep the interpreter from exiting.
+        loop = _asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def work():
+            try:
+                result = fn(*args)
+            except Exception as e:
+                loop.call_soon_threadsafe(future.set_exception, e)
+            else:
+                loop.call_soon_threadsafe(future.set_result, result)
+
+        _threading.Thread(target=work, daemon=True).start()
+        return await future
+
+    async def read(self, n):
+        return await self._call(self._stream.read, n)
+
+    async def readline(self):
+        return await self._call(self._stream.readline)
+
+    async def readexactly(self, n):
+        data = b''
+        while len(data) < n:
+            chunk = await self.read(n - len(data))
+            if not chunk:
+                raise EOFError
+            data += chunk
+        return data